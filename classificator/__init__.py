@@ -0,0 +1,7 @@
+"""**Classificator**
+
+Shot detection, frame export and thumbnail tools for video files.
+Run the tools from the repository root, as modules or as scripts:
+    python -m classificator.classificator /path/to/video.mov \n
+    python classificator/classificator.py /path/to/video.mov
+"""
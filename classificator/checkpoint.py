@@ -0,0 +1,105 @@
+"""**Shot Detection Checkpoints**
+
+Periodic snapshots of a running shot detection, stored next to the video as `<video>.<name>.npz`,
+so an interrupted run resumes where it stopped and ends with the same cuts as an uninterrupted one.
+A snapshot holds the detector state as JSON (next frame, stack counter, cuts so far, comparator
+stats, ...) and the last compared frame, which is pushed into the comparator again on resume.
+Snapshots are ignored when the video's size or mtime, the detection settings or the number of
+workers changed, or when they lack the state the detector needs.
+
+Example:
+    checkpoint = ShotCheckpoint('/path/to/video.mov', settings=[192, 3.0], every=1000) \n
+    for cut in detect_shots('/path/to/video.mov', workers=8, checkpoint=checkpoint):
+        ...
+"""
+import glob
+import json
+import os
+import numpy as np
+from classificator.videoindex import VideoIndex
+
+
+class ShotCheckpoint:
+    """Snapshot file of one detection run, or of one chunk of it.
+
+    Attributes:
+        path: Video path.
+        settings: JSON-serializable detection settings; a snapshot taken with other settings is ignored.
+        every: Number of frames between snapshots.
+        name: Part of the file name that tells runs and chunks apart.
+    """
+
+    def __init__(self, path, settings=None, every=1000, name='shots'):
+        self.path = path
+        self.settings = settings
+        self.every = every
+        self.name = name
+
+    @property
+    def checkpoint_file(self):
+        return f'{self.path}.{self.name}.npz'
+
+    def chunk(self, start, end):
+        """Checkpoint of the chunk start..end of this run."""
+        return ShotCheckpoint(self.path, self.settings, self.every, f'{self.name}.{start}-{end}')
+
+    def run(self, workers):
+        """Checkpoint of a run with `workers` processes.
+        Single and multi-worker runs store different state, so a snapshot of another worker count is ignored.
+        """
+        return ShotCheckpoint(self.path, [self.settings, workers], self.every, self.name)
+
+    def due(self, frame_num):
+        """Whether a snapshot should be taken after frame_num."""
+        return (frame_num + 1) % self.every == 0
+
+    def load(self, keys=()):
+        """Return (state, frame) of the stored snapshot, or None if there is none that still applies.
+
+        Args:
+            keys: State keys the caller needs. A snapshot without one of them is ignored.
+        """
+        try:
+            data = np.load(self.checkpoint_file)
+        except (OSError, ValueError):
+            return None
+        with data:
+            if (not np.array_equal(data['signature'], VideoIndex.signature(self.path))
+                    or str(data['settings']) != json.dumps(self.settings)):
+                return None
+            state = json.loads(str(data['state']))
+            if not isinstance(state, dict) or any(key not in state for key in keys):
+                return None
+            frame = data['frame'] if 'frame' in data.files else None
+            return state, frame
+
+    def save(self, state, frame=None):
+        """Replace the stored snapshot.
+
+        Args:
+            state: JSON-serializable detector state.
+            frame: Last frame pushed into the comparator, if the detector needs it to resume.
+        """
+        arrays = {'signature': VideoIndex.signature(self.path), 'settings': np.array(json.dumps(self.settings)),
+                  'state': np.array(json.dumps(state))}
+        if frame is not None:
+            arrays['frame'] = frame
+        temp_file = self.checkpoint_file[:-4] + '.tmp.npz'
+        np.savez(temp_file, **arrays)
+        os.replace(temp_file, self.checkpoint_file)
+
+    def remove(self):
+        """Delete the stored snapshot once the run is complete."""
+        try:
+            os.remove(self.checkpoint_file)
+        except OSError:
+            pass
+
+    def clear(self):
+        """Delete the stored snapshot and the snapshots of all chunks of this run, e.g. stale ones."""
+        self.remove()
+        for chunk_file in glob.glob(f'{glob.escape(self.path)}.{glob.escape(self.name)}.*-*.npz'):
+            try:
+                os.remove(chunk_file)
+            except OSError:
+                pass
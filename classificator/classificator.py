@@ -1,16 +1,26 @@
-import cv2
+import argparse
+import os
+import numpy as np
+import sys
 import time
 from multiprocessing import Process, Queue
-from skimage.metrics import structural_similarity as compare_ssim
+from queue import Empty
+if __package__ in (None, ''):
+    # Run as `python classificator/classificator.py` or imported from inside this directory: put the
+    # repository root first so that `classificator` is this package and not classificator.py.
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from classificator.checkpoint import ShotCheckpoint
+from classificator.comparator import CascadeComparator
+from classificator.curve import SimilarityCurve
+from classificator.cuts import CSVWriter, Cut, EDLWriter, JSONWriter
+from classificator.decoder import FFmpegReader
+from classificator.framebreaker import Framebreaker
+from classificator.framecache import FrameCache
+from classificator.framering import FrameRing
+from classificator.similarity import SSIMEngine
+from classificator.videoindex import VideoIndex
 
 
-# def parse_args():
-#     parser = argparse.ArgumentParser()
-#     parser.add_argument("original")
-#     parser.add_argument("modified")
-#     return parser.parse_args()
-#
-#
 # imageA = cv2.imread("/home/rapa/test/colored/s1_01_thumbnail.jpg")
 # imageB = cv2.imread("/home/rapa/test/colored/s1_02_thumbnail.jpg")
 # grayA = cv2.cvtColor(imageA, cv2.COLOR_BGR2GRAY)
@@ -27,160 +37,587 @@ from skimage.metrics import structural_similarity as compare_ssim
 # convert2 = ffmpeg.output(convert, "/home/rapa/test/test.mp4")
 # ffmpeg.run(convert2)
 
-def video_process(total_threads, thread_num, result_frm):
-    cap = cv2.VideoCapture("D:\\4_School_Works\\playon.mp4")
-    length = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-    division = length / total_threads
-    start_num = division * (thread_num - 1) + 1
-    end_num = division * thread_num
-    current_frame = 0
+
+SSIM_THRESHOLD = 50
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("video")
+    parser.add_argument("-w", "--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--mad-threshold", type=float, default=3.0)
+    parser.add_argument("--hist-threshold", type=float, default=None)
+    parser.add_argument("--tile", type=int, default=None,
+                        help="score SSIM in tiles of this side only until a pair is clearly above or below the threshold")
+    parser.add_argument("--width", type=int, default=None,
+                        help="decode frames for analysis at this width instead of full resolution")
+    parser.add_argument("-k", "--step", type=int, default=1,
+                        help="compare every k-th frame and bisect differing intervals (single process)")
+    parser.add_argument("--shared", action="store_true",
+                        help="one decoder process feeding the workers through a shared-memory frame ring")
+    parser.add_argument("--candidates", action="store_true",
+                        help="verify only windows around cut candidates found in ffprobe metadata")
+    parser.add_argument("--cache", action="store_true",
+                        help="decode once into the memory-mapped frame cache and analyse from there "
+                             "(at --width, by default 192)")
+    parser.add_argument("--checkpoint", type=int, default=None, metavar="FRAMES",
+                        help="save the detection state every FRAMES frames next to the video and resume from it")
+    parser.add_argument("--curve", action="store_true",
+                        help="score every frame once into <video>.ssim.npz and detect cuts from that curve")
+    parser.add_argument("--threshold", type=float, default=SSIM_THRESHOLD,
+                        help="SSIM percent below which a pair is dissimilar (curve mode)")
+    parser.add_argument("--flash", type=int, default=2,
+                        help="runs of dissimilar pairs whose length modulo this is not 1 are flashes (curve mode)")
+    parser.add_argument("--sweep", type=float, nargs=3, metavar=("START", "STOP", "STEP"),
+                        help="print the cut count of every threshold in the range instead of the cuts")
+    parser.add_argument("--csv", help="also write the cuts to this CSV file")
+    parser.add_argument("--json", help="also write the cuts to this JSON file")
+    parser.add_argument("--edl", help="also write the shots to this EDL file")
+    return parser.parse_args()
+
+
+def split_chunks(length, keyframes, workers):
+    """Split [0, length) into at most `workers` chunks that each start on a keyframe.
+
+    Each chunk is (start, end) and is decoded up to and including `end`, the first frame of the next
+    chunk, so the pair straddling the boundary is still compared. The last chunk's end is None (read to EOF).
+    """
+    bounds = [0]
+    for i in range(1, workers):
+        target = length * i / workers
+        candidates = [k for k in keyframes if bounds[-1] < k < length]
+        if not candidates:
+            break
+        bounds.append(min(candidates, key=lambda k: abs(k - target)))
+    return list(zip(bounds, bounds[1:] + [None]))
+
+
+def cut_step(stack, temp, ssim, frame_num):
+    """Advance the cut state machine by one frame pair.
+
+    A cut is a single dissimilar pair followed by a similar one; two dissimilar pairs in a row are
+    treated as a flash and dropped. `frame_num` is the newer frame of the pair.
+
+    Returns:
+        (stack, temp, cut) where cut is (frame, ssim) or None.
+    """
+    cut = None
+    if ssim < SSIM_THRESHOLD:
+        stack += 1
+        temp = ssim
+    elif stack == 1:
+        cut = (frame_num - 1, temp)
+        stack = 0
+    if stack == 2:
+        stack = 0
+    return stack, temp, cut
+
+
+def video_process(path, chunk_num, start_num, end_num, comparator, width, result_frm, cache=None, checkpoint=None):
+    """Detect cuts in frames start_num..end_num (inclusive) of path and put them on result_frm.
+
+    Frames are decoded by ffmpeg straight to grayscale, scaled to `width` (None keeps the source size),
+    or read from `cache`, a FrameCache, when it holds them. With a ShotCheckpoint as `checkpoint`,
+    the chunk's state is saved every checkpoint.every frames and a saved state is resumed from.
+    The returned stats count this chunk only, whatever the counts of comparator were.
+
+    The state machine's behaviour at the start of a chunk depends on the previous chunk, so the
+    leading pairs up to the first similar one are returned raw as `head` and replayed by merge_chunk.
+    """
     stack = 0
-    cut = 1
-    old_frame = None
-    total_frames = []
-    current_frame += start_num - 1
-    cap.set(cv2.CAP_PROP_POS_FRAMES, current_frame)
-    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-    cap.set(cv2.CAP_PROP_FRAME_WIDTH, width * 0.1)
-    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height * 0.1)
-    while True:
-        ret, frame = cap.read()
-        if ret is True:
-            gray = cv2.cvtColor(frame, cv2.COLOR_RGB2GRAY)
-            if old_frame is not None:
-                score, _ = compare_ssim(old_frame, gray, full=True)
-                ssim = score * 100
-                if ssim < 50:
-                    stack += 1
-                    temp = ssim
-                else:
-                    if stack == 1:
-                        frm = f'cut : {cut}, frame : {current_frame - 1}, SSIM: {temp:.1f}%'
-                        print(frm)
-                        total_frames.append(frm)
-                        stack = 0
-                        cut += 1
-                if stack == 2:
-                    stack = 0
-                # print(f'frame : {current_frame}, SSIM: {ssim:.1f}%')
-                # cv2.imshow('diff_frame', gray)
-            old_frame = gray
-            current_frame += 1
-            if current_frame == end_num:
+    temp = None
+    settled = False
+    head = []
+    cuts = []
+    first = start_num
+    comparator.stats = {stage: [0, 0] for stage in comparator.stats}
+    keys = ('next_frame', 'stack', 'temp', 'settled', 'head', 'cuts', 'stats')
+    saved = checkpoint.load(keys) if checkpoint is not None else None
+    if saved is not None:
+        state, frame = saved
+        first = state['next_frame']
+        stack, temp, settled = state['stack'], state['temp'], state['settled']
+        head = [tuple(pair) for pair in state['head']]
+        cuts = [tuple(cut) for cut in state['cuts']]
+        comparator.reset()
+        comparator.push(frame)
+        comparator.stats = state['stats']
+    reader = None
+    frames = cache.open(path, width) if cache is not None else None
+    if frames is not None:
+        frames = frames[first:None if end_num is None else end_num + 1]
+    else:
+        reader = FFmpegReader(path, width=width, pix_fmt='gray', start_frame=first)
+        frames = reader
+    for current_frame, gray in enumerate(frames, first):
+        if end_num is not None and current_frame > end_num:
+            break
+        ssim = comparator.push(gray)
+        if ssim is not None:
+            if settled is False:
+                head.append((current_frame, ssim))
+                settled = ssim >= SSIM_THRESHOLD
+            else:
+                stack, temp, cut = cut_step(stack, temp, ssim, current_frame)
+                if cut is not None:
+                    cuts.append(cut)
+        if checkpoint is not None and checkpoint.due(current_frame):
+            checkpoint.save({'next_frame': current_frame + 1, 'stack': stack, 'temp': temp, 'settled': settled,
+                             'head': head, 'cuts': cuts, 'stats': comparator.stats}, gray)
+    if reader is not None:
+        reader.release()
+    result_frm.put((chunk_num, head, cuts, (stack, temp), settled, comparator.stats))
+
+
+def merge_chunk(state, result):
+    """Continue the cut state machine of the previous chunks into one video_process result.
+
+    Args:
+        state: (stack, temp) at the end of the previous chunk. (0, None) for the first chunk.
+        result: What video_process put on its queue.
+
+    Returns:
+        (state, cuts) with the state at the end of this chunk and its (frame, ssim) cuts.
+    """
+    stack, temp = state
+    _, head, cuts, chunk_state, settled, _ = result
+    total = []
+    for frame_num, ssim in head:
+        stack, temp, cut = cut_step(stack, temp, ssim, frame_num)
+        if cut is not None:
+            total.append(cut)
+    if settled is True:
+        total.extend(cuts)
+        stack, temp = chunk_state
+    return (stack, temp), total
+
+
+def iter_cuts(path, comparator=None, width=None, cache=None, checkpoint=None):
+    """Detect cuts in path in this process, yielding each Cut as soon as it is confirmed.
+
+    Frames are decoded by ffmpeg straight to grayscale, scaled to `width` (None keeps the source size),
+    or read from `cache`, a FrameCache, which decodes them first if it does not hold them yet.
+    With a cache, width defaults to cache.width, and a video too large for the cache is decoded directly.
+    With a ShotCheckpoint as `checkpoint`, the detector state is saved every checkpoint.every frames.
+    A saved state is resumed from, after yielding the cuts it already holds, and removed at the end.
+    """
+    if comparator is None:
+        comparator = CascadeComparator()
+    stack, temp = 0, None
+    cuts = []
+    first = 0
+    saved = checkpoint.load(('next_frame', 'stack', 'temp', 'cuts', 'stats')) if checkpoint is not None else None
+    if checkpoint is not None and saved is None:
+        checkpoint.clear()
+    if saved is not None:
+        state, frame = saved
+        first = state['next_frame']
+        stack, temp = state['stack'], state['temp']
+        cuts = [tuple(cut) for cut in state['cuts']]
+        comparator.reset()
+        comparator.push(frame)
+        comparator.stats = state['stats']
+    if cache is not None:
+        width = width or cache.width
+        frames = cache.load(path, width)
+    if cache is not None and frames is not None:
+        reader = None
+        frames = frames[first:]
+        fps = FFmpegReader.target_size(path, width)[4]
+    else:
+        reader = FFmpegReader(path, width=width, pix_fmt='gray', start_frame=first)
+        frames = reader
+        fps = reader.fps
+    try:
+        for cut in cuts:
+            yield Cut.from_pair(cut, fps)
+        for frame_num, gray in enumerate(frames, first):
+            ssim = comparator.push(gray)
+            if ssim is not None:
+                stack, temp, cut = cut_step(stack, temp, ssim, frame_num)
+                if cut is not None:
+                    cuts.append(cut)
+                    yield Cut.from_pair(cut, fps)
+            if checkpoint is not None and checkpoint.due(frame_num):
+                checkpoint.save({'next_frame': frame_num + 1, 'stack': stack, 'temp': temp, 'cuts': cuts,
+                                 'stats': comparator.stats}, gray)
+    finally:
+        if reader is not None:
+            reader.release()
+    if checkpoint is not None:
+        checkpoint.remove()
+
+
+def detect_shots(path, workers=1, comparator=None, width=None, cache=None, checkpoint=None):
+    """Detect cuts in path using `workers` processes, each decoding one keyframe-aligned chunk.
+
+    Keyframe positions come from the cached VideoIndex of path. With one worker, iter_cuts runs in
+    this process instead.
+
+    comparator is copied into every worker; the per-stage counts of all workers are summed into
+    comparator.stats. width is the analysis width passed on to video_process. With a FrameCache
+    as `cache`, the video is decoded into it once at width, by default cache.width, and every worker
+    reads its chunk from there. A video too large for the cache is decoded by the workers directly.
+
+    With a ShotCheckpoint as `checkpoint`, every worker saves its chunk's state periodically and the
+    results of finished chunks are saved as they arrive. A run with the same settings and number of
+    workers only starts the chunks that are not finished yet, resuming each from its own snapshot.
+    Snapshots of a run with another number of workers are deleted and the run starts over.
+
+    Yields:
+        Cut records in frame order. A chunk's cuts are yielded as soon as it and every chunk
+        before it have finished.
+    """
+    if comparator is None:
+        comparator = CascadeComparator()
+    if checkpoint is not None:
+        checkpoint = checkpoint.run(max(workers, 1))
+    if workers <= 1:
+        yield from iter_cuts(path, comparator, width, cache, checkpoint)
+        return
+    if cache is not None:
+        width = width or cache.width
+        if cache.load(path, width) is None:
+            cache = None
+    index = VideoIndex.load(path)
+    chunks = [list(chunk) for chunk in split_chunks(index.frame_count, index.keyframes.tolist(), workers)]
+    done = {}
+    if checkpoint is not None:
+        saved = checkpoint.load(('chunks', 'done'))
+        if saved is not None and saved[0]['chunks'] == chunks:
+            done = {int(n): chunk for n, chunk in saved[0]['done'].items()}
+        else:
+            checkpoint.clear()
+            checkpoint.save({'chunks': chunks, 'done': done})
+    result = Queue()
+    procs = [Process(target=video_process,
+                     args=(path, n, start, end, comparator, width, result, cache,
+                           checkpoint.chunk(start, end) if checkpoint is not None else None))
+             for n, (start, end) in enumerate(chunks) if n not in done]
+    for proc in procs:
+        proc.start()
+    pending = {}
+    for n, chunk in done.items():
+        pending[n] = [n] + chunk
+        for stage, counts in chunk[4].items():
+            comparator.stats[stage][0] += counts[0]
+            comparator.stats[stage][1] += counts[1]
+    state = (0, None)
+    next_chunk = 0
+    waiting = len(procs)
+    try:
+        while True:
+            while next_chunk in pending:
+                state, cuts = merge_chunk(state, pending.pop(next_chunk))
+                for cut in cuts:
+                    yield Cut.from_pair(cut, index.fps)
+                next_chunk += 1
+            if waiting == 0:
                 break
+            try:
+                chunk = result.get(timeout=1)
+            except Empty:
+                if not any(proc.is_alive() for proc in procs):
+                    raise RuntimeError('A shot detection worker exited without a result; '
+                                       'run again with a checkpoint to resume the finished chunks.')
+                continue
+            waiting -= 1
+            pending[chunk[0]] = chunk
+            for stage, counts in chunk[5].items():
+                comparator.stats[stage][0] += counts[0]
+                comparator.stats[stage][1] += counts[1]
+            if checkpoint is not None:
+                done[chunk[0]] = list(chunk[1:])
+                checkpoint.save({'chunks': chunks, 'done': done})
+                checkpoint.chunk(*chunks[chunk[0]]).remove()
+    finally:
+        for proc in procs:
+            if proc.is_alive() and next_chunk < len(chunks):
+                proc.terminate()
+            proc.join()
+    if checkpoint is not None:
+        checkpoint.remove()
+
+
+def dense_cuts(frames, first, engine):
+    """Run the cut state machine over consecutive buffered frames in one vectorized SSIM call.
+
+    Args:
+        frames: Grayscale frames; frames[0] is frame number `first`.
+
+    Returns:
+        List of (frame, ssim) cuts.
+    """
+    if len(frames) < 2:
+        return []
+    stack, temp = 0, None
+    cuts = []
+    for n, pair in enumerate(engine.score_stack(frames) * 100, first + 1):
+        stack, temp, cut = cut_step(stack, temp, float(pair), n)
+        if cut is not None:
+            cuts.append(cut)
+    return cuts
+
+
+def refine_cut(path, start_num, end_num, engine, width=None):
+    """Find the exact cut inside the sampled interval start_num..end_num.
+
+    Frames start_num - 1 .. end_num + 1 are decoded once to grayscale by ffmpeg, scaled to `width`
+    (None keeps the source size), into a buffer. While the current shot's first frame differs from the
+    interval's last frame, the first frame that no longer matches it is bisected for and confirmed with
+    the dense rule (a single dissimilar pair between two similar ones). Anything else, e.g. a fade or a
+    flash, falls back to scanning the buffered frames densely in one vectorized call.
+
+    Returns:
+        List of (frame, ssim) cuts in the interval.
+    """
+    first = max(start_num - 1, 0)
+    reader = FFmpegReader(path, width=width, pix_fmt='gray', start_frame=first)
+    frames = []
+    for _ in range(first, end_num + 2):
+        ret, gray = reader.read()
+        if ret is False:
+            break
+        frames.append(gray)
+    reader.release()
+    stats = {}
+
+    def score(i, j):
+        for n in (i, j):
+            if n not in stats:
+                stats[n] = engine.stats(frames[n])
+        return float(engine.score_stats(stats[i], stats[j])) * 100
+
+    low = start_num - first
+    end = min(end_num - first, len(frames) - 1)
+    cuts = []
+    while low < end and score(low, end) < SSIM_THRESHOLD:
+        high = end
+        while high - low > 1:
+            mid = (low + high) // 2
+            if score(low, mid) < SSIM_THRESHOLD:
+                high = mid
+            else:
+                low = mid
+        ssim = score(high - 1, high)
+        if (ssim >= SSIM_THRESHOLD or high + 1 >= len(frames) or score(high, high + 1) < SSIM_THRESHOLD
+                or (high >= 2 and score(high - 2, high - 1) < SSIM_THRESHOLD)):
+            break
+        cuts.append((first + high, ssim))
+        low = high
+    else:
+        return cuts
+    return [cut for cut in dense_cuts(frames, first, engine) if start_num < cut[0] <= end_num]
+
+
+def sampled_process(path, step=10, comparator=None, width=None):
+    """Detect cuts by comparing every step-th frame and refining differing intervals with refine_cut.
+
+    ffmpeg selects the sampled frames, so skipped frames are decoded but never converted or compared.
+    Frames are ffmpeg grayscale at `width` like in every other detector, so scores and thresholds are the same.
+    Cuts match the dense scan of video_process, except that a shot shorter than step frames whose
+    first and last neighbours look alike can be missed.
+
+    Yields:
+        Cut records in frame order.
+    """
+    if comparator is None:
+        comparator = CascadeComparator()
+    engine = SSIMEngine()
+    index = VideoIndex.load(path)
+    length = index.frame_count
+    if length == 0:
+        return
+    samples = list(range(0, length, step))
+    if samples[-1] != length - 1:
+        samples.append(length - 1)
+    reader = FFmpegReader(path, width=width, pix_fmt='gray', step=step, frames=[length - 1])
+    sample = None
+    try:
+        for target, gray in zip(samples, reader):
+            ssim = comparator.push(gray)
+            if ssim is not None and ssim < SSIM_THRESHOLD:
+                for cut in refine_cut(path, sample, target, engine, width):
+                    yield Cut.from_pair(cut, index.fps)
+            sample = target
+    finally:
+        reader.release()
+
+
+def verify_candidates(path, candidates, window=2, width=None):
+    """Run the dense cut rule only on frames within `window` of each candidate frame.
+
+    Overlapping windows are merged and each merged span is decoded once to ffmpeg grayscale at `width`.
+
+    Yields:
+        Cut records in frame order.
+    """
+    spans = []
+    for frame_num in sorted(candidates):
+        start, end = max(frame_num - window - 1, 0), frame_num + window + 1
+        if spans and start <= spans[-1][1]:
+            spans[-1][1] = end
         else:
-            print('ERROR!')
+            spans.append([start, end])
+    engine = SSIMEngine()
+    fps = VideoIndex.load(path).fps
+    for start, end in spans:
+        reader = FFmpegReader(path, width=width, pix_fmt='gray', start_frame=start)
+        frames = []
+        for _ in range(start, end + 1):
+            ret, gray = reader.read()
+            if ret is False:
+                break
+            frames.append(gray)
+        reader.release()
+        for cut in dense_cuts(frames, start, engine):
+            yield Cut.from_pair(cut, fps)
+
+
+def decode_to_ring(path, width, ring):
+    """Decoder process of shared_shots: write every gray frame of path into ring."""
+    reader = FFmpegReader(path, width=width, pix_fmt='gray')
+    for gray in reader:
+        ring.put(gray)
+    reader.release()
+    ring.close_writer()
+
+
+def ring_process(ring, reader_num, workers, block, comparator, result_frm):
+    """Analysis process of shared_shots.
+
+    Pairs are split into blocks of `block` pairs and reader_num takes every workers-th block.
+    Frames are read from the ring as zero-copy views and only the scores are sent back.
+    """
+    scores = []
+    block_num = reader_num
+    while True:
+        first = block_num * block
+        ring.release(reader_num, first)
+        if ring.get(first) is None:
             break
-    cap.release()
-    cv2.destroyAllWindows()
-    result_frm.put(total_frames)
-    return
+        comparator.reset()
+        for n in range(first, first + block + 1):
+            gray = ring.get(n)
+            if gray is None:
+                break
+            ssim = comparator.push(gray)
+            if ssim is not None:
+                scores.append((n, ssim))
+        block_num += workers
+    comparator.reset()
+    ring.release(reader_num, np.iinfo(np.int64).max)
+    result_frm.put((scores, comparator.stats))
+
+
+def shared_shots(path, workers=2, comparator=None, width=None, block=16, max_bytes=256 << 20):
+    """Detect cuts with one decoder process and `workers` analysis processes sharing a FrameRing.
+
+    Decode and comparison scale independently: the decoder never waits for a particular worker
+    except when the ring is full. The per-pair scores are merged and run through cut_step in order,
+    so the cuts are those of a single sequential scan.
+
+    The ring lives in /dev/shm and holds at most max_bytes of frames. Full-resolution frames of
+    large videos get fewer slots, and if need be smaller blocks, instead of a ring of
+    (workers + 1) * (block + 1) frames. That costs parallelism, not results.
+
+    If the decoder or a worker exits with an error, the other processes are stopped and a
+    RuntimeError is raised. The shared memory is freed in every case.
+
+    Yields:
+        Cut records in frame order, once every worker has finished.
+    """
+    if comparator is None:
+        comparator = CascadeComparator()
+    frame_width, frame_height, _, _, fps = FFmpegReader.target_size(path, width)
+    if frame_width < 1 or frame_height < 1:
+        raise ValueError(f'Cannot read the frame size of {path}')
+    fit = max(2, max_bytes // (frame_width * frame_height))
+    block = max(1, min(block, fit - 1))
+    slots = max(block + 1, min((workers + 1) * (block + 1), fit))
+    ring = FrameRing((frame_height, frame_width), slots=slots, readers=workers)
+    try:
+        result = Queue()
+        decoder = Process(target=decode_to_ring, args=(path, width, ring))
+        procs = [Process(target=ring_process, args=(ring, n, workers, block, comparator, result))
+                 for n in range(workers)]
+        results = []
+        try:
+            decoder.start()
+            for proc in procs:
+                proc.start()
+            while len(results) < workers:
+                try:
+                    results.append(result.get(timeout=1))
+                except Empty:
+                    if any(proc.exitcode not in (None, 0) for proc in procs + [decoder]):
+                        raise RuntimeError(f'A shared_shots process exited with an error on {path}')
+        finally:
+            for proc in procs + [decoder]:
+                if proc.is_alive() and len(results) < workers:
+                    proc.terminate()
+                if proc.pid is not None:
+                    proc.join()
+        if decoder.exitcode != 0:
+            raise RuntimeError(f'The shared_shots decoder exited with an error on {path}')
+    finally:
+        ring.close()
+        ring.unlink()
+    for _, stats in results:
+        for stage, counts in stats.items():
+            comparator.stats[stage][0] += counts[0]
+            comparator.stats[stage][1] += counts[1]
+    stack, temp = 0, None
+    for frame_num, ssim in sorted(x for scores, _ in results for x in scores):
+        stack, temp, cut = cut_step(stack, temp, ssim, frame_num)
+        if cut is not None:
+            yield Cut.from_pair(cut, fps)
 
 
 if __name__ == "__main__":
+    args = parse_args()
     start_time = time.time()
-    result = Queue()
-    th1 = Process(target=video_process, args=(30, 1, result))
-    th2 = Process(target=video_process, args=(30, 2, result))
-    th3 = Process(target=video_process, args=(30, 3, result))
-    th4 = Process(target=video_process, args=(30, 4, result))
-    th5 = Process(target=video_process, args=(30, 5, result))
-    th6 = Process(target=video_process, args=(30, 6, result))
-    th7 = Process(target=video_process, args=(30, 7, result))
-    th8 = Process(target=video_process, args=(30, 8, result))
-    th9 = Process(target=video_process, args=(30, 9, result))
-    th10 = Process(target=video_process, args=(30, 10, result))
-    th11 = Process(target=video_process, args=(30, 11, result))
-    th12 = Process(target=video_process, args=(30, 12, result))
-    th13 = Process(target=video_process, args=(30, 13, result))
-    th14 = Process(target=video_process, args=(30, 14, result))
-    th15 = Process(target=video_process, args=(30, 15, result))
-    th16 = Process(target=video_process, args=(30, 16, result))
-    th17 = Process(target=video_process, args=(30, 17, result))
-    th18 = Process(target=video_process, args=(30, 18, result))
-    th19 = Process(target=video_process, args=(30, 19, result))
-    th20 = Process(target=video_process, args=(30, 20, result))
-    th21 = Process(target=video_process, args=(30, 21, result))
-    th22 = Process(target=video_process, args=(30, 22, result))
-    th23 = Process(target=video_process, args=(30, 23, result))
-    th24 = Process(target=video_process, args=(30, 24, result))
-    th25 = Process(target=video_process, args=(30, 25, result))
-    th26 = Process(target=video_process, args=(30, 26, result))
-    th27 = Process(target=video_process, args=(30, 27, result))
-    th28 = Process(target=video_process, args=(30, 28, result))
-    th29 = Process(target=video_process, args=(30, 29, result))
-    th30 = Process(target=video_process, args=(30, 30, result))
-
-    th1.start()
-    th2.start()
-    th3.start()
-    th4.start()
-    th5.start()
-    th6.start()
-    th7.start()
-    th8.start()
-    th9.start()
-    th10.start()
-    th11.start()
-    th12.start()
-    th13.start()
-    th14.start()
-    th15.start()
-    th16.start()
-    th17.start()
-    th18.start()
-    th19.start()
-    th20.start()
-    th21.start()
-    th22.start()
-    th23.start()
-    th24.start()
-    th25.start()
-    th26.start()
-    th27.start()
-    th28.start()
-    th29.start()
-    th30.start()
-
-    th1.join()
-    th2.join()
-    th3.join()
-    th4.join()
-    th5.join()
-    th6.join()
-    th7.join()
-    th8.join()
-    th9.join()
-    th10.join()
-    th11.join()
-    th12.join()
-    th13.join()
-    th14.join()
-    th15.join()
-    th16.join()
-    th17.join()
-    th18.join()
-    th19.join()
-    th20.join()
-    th21.join()
-    th22.join()
-    th23.join()
-    th24.join()
-    th25.join()
-    th26.join()
-    th27.join()
-    th28.join()
-    th29.join()
-    th30.join()
-
-    result.put('STOP')
-    total = []
-    while True:
-        tmp = result.get()
-        if tmp == 'STOP':
-            break
-        else:
-            total.append(tmp)
-    print(f"Result: {total}")
+    comparator = CascadeComparator(args.mad_threshold, args.hist_threshold, tile=args.tile)
+    if args.sweep is not None:
+        curve = SimilarityCurve.load(args.video, args.width)
+        for threshold, count in curve.sweep(np.arange(*args.sweep), args.flash):
+            print(f'threshold : {threshold:.1f}%, cuts : {count}')
+        print("--- %s seconds ---" % (time.time() - start_time))
+        raise SystemExit
+    if args.curve is True:
+        total = SimilarityCurve.load(args.video, args.width).cuts(args.threshold, args.flash)
+    elif args.candidates is True:
+        breaker = Framebreaker()
+        breaker.path = args.video
+        total = verify_candidates(args.video, breaker.cut_candidates(), width=args.width)
+    elif args.shared is True:
+        total = shared_shots(args.video, args.workers, comparator, args.width)
+    elif args.step > 1:
+        total = sampled_process(args.video, args.step, comparator, args.width)
+    else:
+        cache = FrameCache() if args.cache is True else None
+        width = args.width or (cache.width if cache is not None else None)
+        checkpoint = None
+        if args.checkpoint:
+            settings = [width, args.mad_threshold, args.hist_threshold, args.tile]
+            checkpoint = ShotCheckpoint(args.video, settings, every=args.checkpoint)
+        total = detect_shots(args.video, args.workers, comparator, width, cache, checkpoint)
+    index = VideoIndex.load(args.video)
+    length = index.frame_count
+    fps = index.fps
+    files = []
+    writers = []
+    for out_path, writer in ((args.csv, CSVWriter), (args.json, JSONWriter), (args.edl, EDLWriter)):
+        if out_path:
+            files.append(open(out_path, 'w', newline=''))
+            writers.append(writer(files[-1], fps) if writer is EDLWriter else writer(files[-1]))
+    for num, cut in enumerate(total, 1):
+        print(f'cut : {num}, frame : {cut.frame}, time : {cut.time:.2f}s, SSIM: {cut.score:.1f}%')
+        for writer in writers:
+            writer.write(cut)
+    for writer in writers:
+        writer.close(end_frame=length)
+    for fp in files:
+        fp.close()
+    print(comparator.report())
     print("--- %s seconds ---" % (time.time() - start_time))
@@ -0,0 +1,112 @@
+"""**Frame Comparators**
+
+Comparators score consecutive frames of a video for the shot detector in classificator.py.
+Frames are pushed one at a time and each push returns the similarity (0-100) to the previous frame.
+
+Example:
+    comparator = CascadeComparator(mad_threshold=3.0) \n
+    for gray in frames:
+        score = comparator.push(gray) \n
+    print(comparator.report())
+"""
+import cv2
+import numpy as np
+from classificator.similarity import SSIMEngine
+
+SKIPPED_SCORE = 100.0
+
+
+class CascadeComparator:
+    """Runs cheap checks on a heavily downscaled luma plane before full SSIM.
+
+    A pair the cheap stages settle as similar gets SKIPPED_SCORE and never reaches SSIM.
+    Only pairs that every enabled stage passes on as cut candidates are scored with SSIM.
+
+    Attributes:
+        mad_threshold: Mean absolute difference (0-255) below which a pair is settled as similar.
+            None disables the stage.
+        hist_threshold: Histogram correlation (-1 to 1) above which a pair is settled as similar.
+            None disables the stage.
+        thumb_width: Width of the downscaled plane used by the cheap stages.
+        ssim_threshold: SSIM (0-100) below which a pair counts as a cut candidate in stats.
+        tile: If set, SSIM is computed in tiles of this side only until the pair is known to be above
+            or below ssim_threshold (see SSIMEngine.decide). Pairs below it still get their exact score.
+            None computes the exact score of every pair.
+        stats: Per-stage [passed, rejected] counts. Passed pairs go on to the next stage.
+    """
+
+    def __init__(self, mad_threshold=3.0, hist_threshold=None, thumb_width=64, ssim_threshold=50, tile=None):
+        self.mad_threshold = mad_threshold
+        self.hist_threshold = hist_threshold
+        self.thumb_width = thumb_width
+        self.ssim_threshold = ssim_threshold
+        self.tile = tile
+        self.stats = {'mad': [0, 0], 'hist': [0, 0], 'ssim': [0, 0]}
+        self.engine = SSIMEngine()
+        self._old = None
+
+    def reset(self):
+        """Forget the previous frame, e.g. after a seek."""
+        self._old = None
+
+    def thumb(self, gray):
+        """Downscale a grayscale frame to thumb_width, keeping the aspect ratio."""
+        height, width = gray.shape[:2]
+        if width <= self.thumb_width:
+            return gray
+        size = (self.thumb_width, max(1, round(height * self.thumb_width / width)))
+        return cv2.resize(gray, size, interpolation=cv2.INTER_AREA)
+
+    @staticmethod
+    def histogram(small):
+        """32-bin normalized luma histogram."""
+        hist = np.bincount((small >> 3).ravel(), minlength=32).astype(np.float32)
+        return hist / hist.sum()
+
+    def push(self, gray):
+        """Score gray against the previously pushed frame.
+
+        Args:
+            gray: Grayscale frame as a uint8 array.
+
+        Returns:
+            Similarity in percent, or None for the first frame.
+        """
+        # [frame, small plane, histogram, SSIM stats]; the last two are filled in when a stage needs them
+        # and reused by the next pair.
+        new = [gray, self.thumb(gray), None, None]
+        old, self._old = self._old, new
+        if old is None:
+            return None
+        if self.mad_threshold is not None:
+            if cv2.absdiff(old[1], new[1]).mean() < self.mad_threshold:
+                self.stats['mad'][1] += 1
+                return SKIPPED_SCORE
+            self.stats['mad'][0] += 1
+        if self.hist_threshold is not None:
+            for entry in (old, new):
+                if entry[2] is None:
+                    entry[2] = self.histogram(entry[1])
+            if np.corrcoef(old[2], new[2])[0, 1] > self.hist_threshold:
+                self.stats['hist'][1] += 1
+                return SKIPPED_SCORE
+            self.stats['hist'][0] += 1
+        if self.tile is not None:
+            score, exact = self.engine.decide(old[0], new[0], self.ssim_threshold, self.tile)
+            if score >= self.ssim_threshold:
+                self.stats['ssim'][1] += 1
+                return score
+        for entry in (old, new):
+            if entry[3] is None:
+                entry[3] = self.engine.stats(entry[0])
+        score = float(self.engine.score_stats(old[3], new[3])) * 100
+        self.stats['ssim'][0 if score < self.ssim_threshold else 1] += 1
+        return score
+
+    def report(self):
+        """Format stats as one line per enabled stage."""
+        lines = []
+        for stage, (passed, rejected) in self.stats.items():
+            if passed + rejected:
+                lines.append(f'{stage} : passed {passed}, rejected {rejected}')
+        return '\n'.join(lines)
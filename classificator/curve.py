@@ -0,0 +1,116 @@
+"""**Similarity Curve**
+
+Per-frame SSIM series of a video, computed once and stored as float32 next to the video
+(`<video>.ssim.npz`), so cuts can be re-detected for any threshold or flash rule without decoding
+the video again. The stored curve is rebuilt when the video's size or mtime, or the analysis
+width, changes.
+
+Example:
+    curve = SimilarityCurve.load('/path/to/video.mov', width=192) \n
+    cuts = curve.cuts(threshold=40) \n
+    counts = curve.sweep(range(20, 80, 5)) \n
+    Counts will be like:
+        [(20, 1), (25, 2), ... (75, 9)]
+"""
+import os
+import numpy as np
+from classificator.cuts import Cut
+from classificator.decoder import FFmpegReader
+from classificator.similarity import SSIMEngine
+from classificator.videoindex import VideoIndex
+
+
+class SimilarityCurve:
+    """SSIM in percent of every consecutive frame pair of a video.
+
+    Attributes:
+        path: Video path the curve describes.
+        scores: float32 array; scores[i] compares frame i with frame i + 1.
+        fps: Frame rate of the video.
+        width: Analysis width the frames were scored at, 0 for the source size.
+    """
+
+    def __init__(self, path, scores, fps, width):
+        self.path = path
+        self.scores = scores
+        self.fps = fps
+        self.width = width
+
+    @staticmethod
+    def curve_file(path):
+        """Curve file location for a video path."""
+        return path + '.ssim.npz'
+
+    @classmethod
+    def cached(cls, path, width=None):
+        """Return the stored curve if it is still current for this width, otherwise None."""
+        try:
+            data = np.load(cls.curve_file(path))
+        except (OSError, ValueError):
+            return None
+        with data:
+            if (not np.array_equal(data['signature'], VideoIndex.signature(path))
+                    or int(data['width']) != (width or 0)):
+                return None
+            return cls(path, data['scores'], float(data['fps']), int(data['width']))
+
+    @classmethod
+    def build(cls, path, width=None):
+        """Score every frame pair of path with exact SSIM, store the curve and return it.
+
+        No prefilter is used, so every stored score is real and any threshold can be applied later.
+        """
+        engine = SSIMEngine()
+        reader = FFmpegReader(path, width=width, pix_fmt='gray')
+        scores = []
+        for gray in reader:
+            score = engine.push(gray)
+            if score is not None:
+                scores.append(score)
+        reader.release()
+        curve = cls(path, np.array(scores, dtype=np.float32), reader.fps, width or 0)
+        curve_file = cls.curve_file(path)
+        temp_file = curve_file[:-4] + '.tmp.npz'
+        np.savez(temp_file, signature=VideoIndex.signature(path), scores=curve.scores,
+                 fps=np.array(curve.fps, dtype=np.float64), width=np.array(curve.width))
+        os.replace(temp_file, curve_file)
+        return curve
+
+    @classmethod
+    def load(cls, path, width=None):
+        """Return the stored curve, building it first if it is missing or outdated."""
+        curve = cls.cached(path, width)
+        if curve is None:
+            curve = cls.build(path, width)
+        return curve
+
+    def cut_frames(self, threshold=50, flash=2):
+        """Vectorized equivalent of running classificator.cut_step over the curve.
+
+        A run of pairs below threshold that is followed by a similar pair is a cut when its length
+        modulo `flash` is 1: with the default of 2, one dissimilar pair is a cut and two in a row
+        are a flash, as in cut_step.
+
+        Returns:
+            (frames, scores) arrays: first frame of each new shot and the SSIM of the last
+            dissimilar pair before it.
+        """
+        low = np.concatenate(([False], self.scores < threshold, [False]))
+        edges = np.flatnonzero(low[1:] != low[:-1])
+        starts, ends = edges[0::2], edges[1::2]
+        keep = (ends < len(self.scores)) & ((ends - starts) % flash == 1)
+        ends = ends[keep]
+        return ends, self.scores[ends - 1]
+
+    def cuts(self, threshold=50, flash=2):
+        """Cut records for a threshold and flash rule, see cut_frames."""
+        frames, scores = self.cut_frames(threshold, flash)
+        return [Cut.from_pair((int(frame), float(score)), self.fps) for frame, score in zip(frames, scores)]
+
+    def sweep(self, thresholds, flash=2):
+        """Number of cuts for each candidate threshold.
+
+        Returns:
+            List of (threshold, cut count).
+        """
+        return [(threshold, len(self.cut_frames(threshold, flash)[0])) for threshold in thresholds]
@@ -0,0 +1,113 @@
+"""**Cut Records**
+
+Compact cut records produced by the shot detectors in classificator.py, and writers that export
+them to CSV, JSON or a CMX3600 EDL one cut at a time, so multi-hour results never have to be
+held in memory or parsed back from text.
+
+Example:
+    with open('cuts.edl', 'w') as fp:
+        writer = EDLWriter(fp, fps=24) \n
+        for cut in detect_shots(path, workers=8):
+            writer.write(cut) \n
+        writer.close(end_frame=length)
+"""
+import csv
+import json
+
+
+class Cut:
+    """One detected cut.
+
+    Attributes:
+        frame: First frame of the new shot.
+        time: Time of that frame in seconds.
+        score: SSIM in percent between the frame and the one before it.
+    """
+    __slots__ = ('frame', 'time', 'score')
+
+    def __init__(self, frame, time, score):
+        self.frame = frame
+        self.time = time
+        self.score = score
+
+    @classmethod
+    def from_pair(cls, cut, fps):
+        """Make a Cut from a (frame, ssim) tuple of cut_step."""
+        frame, score = cut
+        return cls(frame, frame / fps if fps else 0.0, score)
+
+    def as_dict(self):
+        return {'frame': self.frame, 'time': self.time, 'score': self.score}
+
+    def __repr__(self):
+        return f'Cut(frame={self.frame}, time={self.time:.3f}, score={self.score:.1f})'
+
+
+class CSVWriter:
+    """Writes one CSV row per cut: cut number, frame, time, score."""
+
+    def __init__(self, fp):
+        self._writer = csv.writer(fp)
+        self._writer.writerow(['cut', 'frame', 'time', 'score'])
+        self._count = 0
+
+    def write(self, cut):
+        self._count += 1
+        self._writer.writerow([self._count, cut.frame, f'{cut.time:.3f}', f'{cut.score:.2f}'])
+
+    def close(self, end_frame=None):
+        pass
+
+
+class JSONWriter:
+    """Writes a JSON array of cut objects, one element per write."""
+
+    def __init__(self, fp):
+        self._fp = fp
+        self._fp.write('[')
+        self._count = 0
+
+    def write(self, cut):
+        self._fp.write((',\n ' if self._count else '\n ') + json.dumps(cut.as_dict()))
+        self._count += 1
+
+    def close(self, end_frame=None):
+        self._fp.write('\n]\n')
+
+
+class EDLWriter:
+    """Writes a CMX3600 EDL with one event per shot.
+
+    An event is written when the cut that ends it arrives; close() writes the last shot up to end_frame.
+    """
+
+    def __init__(self, fp, fps, title='shots', reel='AX'):
+        self._fp = fp
+        self._fps = fps
+        self._reel = reel
+        self._start = 0
+        self._event = 0
+        self._fp.write(f'TITLE: {title}\nFCM: NON-DROP FRAME\n\n')
+
+    def timecode(self, frame):
+        """Non-drop-frame timecode of a frame number."""
+        fps = max(1, round(self._fps))
+        seconds, frames = divmod(frame, fps)
+        minutes, seconds = divmod(seconds, 60)
+        hours, minutes = divmod(minutes, 60)
+        return f'{hours:02d}:{minutes:02d}:{seconds:02d}:{frames:02d}'
+
+    def _event_line(self, start, end):
+        self._event += 1
+        src_in, src_out = self.timecode(start), self.timecode(end)
+        self._fp.write(f'{self._event:03d}  {self._reel:<8} V     C        '
+                       f'{src_in} {src_out} {src_in} {src_out}\n')
+
+    def write(self, cut):
+        if cut.frame > self._start:
+            self._event_line(self._start, cut.frame)
+            self._start = cut.frame
+
+    def close(self, end_frame=None):
+        if end_frame is not None and end_frame > self._start:
+            self._event_line(self._start, end_frame)
@@ -0,0 +1,144 @@
+"""**FFmpeg Reader**
+
+Decodes a video through an ffmpeg rawvideo pipe, scaling and converting the pixel format inside
+ffmpeg, so frames reach Python as NumPy arrays already at the target size.
+For analysis at a fraction of the source resolution this avoids moving and colour-converting
+full-size frames.
+
+Example:
+    reader = FFmpegReader('/path/to/video.mov', width=192, pix_fmt='gray') \n
+    for gray in reader:
+        ... \n
+    reader.release() \n
+    Only some frames, still in one ffmpeg process:
+        reader = FFmpegReader('/path/to/video.mov', pix_fmt='bgr24', frames=[24, 480, 960]) \n
+        reader = FFmpegReader('/path/to/video.mov', pix_fmt='gray', step=10)
+"""
+import cv2
+import ffmpeg
+import numpy as np
+
+from classificator.videoindex import VideoIndex
+
+CHANNELS = {'gray': 1, 'y': 1, 'bgr24': 3, 'rgb24': 3}
+
+
+class FFmpegReader:
+    """Reads frames of a video as uint8 arrays of shape (height, width) or (height, width, 3).
+
+    Attributes:
+        width: Width of the delivered frames.
+        height: Height of the delivered frames.
+        fps: Frame rate of the source.
+        pix_fmt: 'gray', 'bgr24' or 'rgb24', or 'y' for the untouched luma plane of YUV sources
+            (limited-range values are kept, where 'gray' stretches them to 0-255).
+    """
+
+    def __init__(self, path, width=None, height=None, pix_fmt='gray', start_frame=0, frames=None, step=None):
+        """Start decoding path.
+
+        Args:
+            path: Video path.
+            width: Target width. If only one of width and height is given, the other keeps the aspect ratio.
+                If neither is given, frames keep the source size.
+            height: Target height.
+            pix_fmt: Pixel format of the delivered frames.
+            start_frame: First frame to deliver. ffmpeg seeks to its pts from the VideoIndex, so the
+                position holds for variable frame rate sources too.
+            frames: Deliver only these frame numbers, in ascending order, selected inside ffmpeg.
+                Frame numbers count from start_frame.
+            step: Deliver only every step-th frame, counted from start_frame, and the frames in `frames`.
+        """
+        width, height, src_width, src_height, self.fps = self.target_size(path, width, height)
+        self.width = width
+        self.height = height
+        self.pix_fmt = pix_fmt
+        if start_frame:
+            stream = ffmpeg.input(path, ss=self.seek_time(path, start_frame, self.fps))
+        else:
+            stream = ffmpeg.input(path)
+        if pix_fmt == 'y':
+            stream = stream.filter('extractplanes', 'y')
+        if frames is not None or step is not None:
+            terms = [f'eq(n,{n})' for n in sorted(set(frames or ()))]
+            if step is not None:
+                terms.insert(0, f'not(mod(n,{step}))')
+            stream = stream.filter('select', '+'.join(terms))
+        if (width, height) != (src_width, src_height):
+            stream = stream.filter('scale', width, height, flags='area')
+        self._proc = (
+            stream
+            .output('pipe:', format='rawvideo', pix_fmt='gray' if pix_fmt == 'y' else pix_fmt, vsync='passthrough', an=None)
+            .global_args('-v', 'error')
+            .run_async(pipe_stdout=True)
+        )
+        channels = CHANNELS[pix_fmt]
+        self._shape = (height, width) if channels == 1 else (height, width, channels)
+        self._frame_bytes = width * height * channels
+
+    @staticmethod
+    def target_size(path, width=None, height=None):
+        """Resolve the size frames of path will be delivered at, without starting ffmpeg.
+
+        Returns:
+            (width, height, source width, source height, fps)
+        """
+        cap = cv2.VideoCapture(path)
+        src_width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        src_height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        cap.release()
+        if width and not height:
+            height = max(1, round(src_height * width / src_width))
+        elif height and not width:
+            width = max(1, round(src_width * height / src_height))
+        elif not width and not height:
+            width, height = src_width, src_height
+        return width, height, src_width, src_height, fps
+
+    @staticmethod
+    def seek_time(path, start_frame, fps=None):
+        """Seek position, in seconds from the start of the video, that makes frame start_frame the first
+        frame ffmpeg delivers.
+
+        The position lies halfway between the pts of start_frame and of the frame before it, so rounding
+        in the reported timestamps cannot drop start_frame or let the previous frame through.
+        Without pts in the index it falls back to start_frame / fps.
+        """
+        index = VideoIndex.load(path)
+        pts = index.pts
+        if start_frame < len(pts) and not np.isnan(pts[[0, start_frame - 1, start_frame]]).any():
+            return float((pts[start_frame - 1] + pts[start_frame]) / 2 - pts[0])
+        fps = fps or index.fps
+        return (start_frame - 0.5) / fps if fps else 0.0
+
+    def read(self):
+        """Read the next frame.
+
+        Returns:
+            (True, frame) like cv2.VideoCapture.read, or (False, None) at the end of the video.
+        """
+        data = self._proc.stdout.read(self._frame_bytes)
+        if len(data) < self._frame_bytes:
+            return False, None
+        return True, np.frombuffer(data, np.uint8).reshape(self._shape)
+
+    def release(self):
+        """Stop ffmpeg and close the pipe."""
+        if self._proc.poll() is None:
+            self._proc.kill()
+        self._proc.stdout.close()
+        self._proc.wait()
+
+    def __iter__(self):
+        while True:
+            ret, frame = self.read()
+            if ret is False:
+                return
+            yield frame
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
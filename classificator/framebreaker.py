@@ -1,15 +1,25 @@
-import ffmpeg
 import os
-import subprocess
+import sys
 import cv2
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+if __package__ in (None, ''):
+    # Run as `python classificator/framebreaker.py` or imported from inside this directory: put the
+    # repository root first so that `classificator` is this package and not classificator.py.
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from classificator.decoder import FFmpegReader
+from classificator.imagewriter import ImageWriter
+from classificator.videoindex import VideoIndex, probe_frames
+from classificator.ycbcr import YCbCrComparator, rgb_to_ycbcr
 
 
 class Framebreaker:
     def __init__(self):
         self._path = None
-        self.iframes = None
         self.bframes = None
         self.pframes = None
+        self.writer = None
+        self.comparator = YCbCrComparator()
 
     @property
     def path(self):
@@ -20,33 +30,168 @@ class Framebreaker:
         if video_path:
             self._path = video_path
 
+    def open_writer(self):
+        """Return self.writer, or a default JPEG ImageWriter if none is set."""
+        return self.writer if self.writer is not None else ImageWriter()
+
+    def close_writer(self, writer):
+        """Wait for writer's images and print any that failed. A shared self.writer is only flushed."""
+        failures = writer.flush() if writer is self.writer else writer.close()
+        for outname, err in failures:
+            print('Failed: ' + outname + ' (' + err + ')')
+        return failures
+
     def iframes(self):
-        command = 'ffprobe -v error -show_entries frame=pict_type -of default=noprint_wrappers=1'.split()
-        out = subprocess.check_output(command + [self.path]).decode()
-        f_types = out.replace('pict_type=', '').split()
-        frame_types = zip(range(len(f_types)), f_types)
-        i_frames = [x[0] for x in frame_types if x[1] == 'I']
-        if i_frames:
-            cap = cv2.VideoCapture(self.path)
-            for frame_no in i_frames:
-                cap.set(cv2.CAP_PROP_POS_FRAMES, frame_no)
-                ret, frame = cap.read()
-                outname = self.path + 'i_frame_' + str(frame_no) + '.jpg'
-                cv2.imwrite(outname, frame)
-            cap.release()
+        i_frames = self.i_frame_numbers(self.path)
+        writer = self.open_writer()
+        written = list(self.write_frames(self.path, i_frames,
+                                         lambda n: self.path + 'i_frame_' + str(n) + writer.extension, writer))
+        failed = set(outname for outname, _ in self.close_writer(writer))
+        written = [outname for outname in written if outname not in failed]
+        if written:
             print("I-Frame selection Done!!")
+        return written
 
-    def get_ipb_frmaes(self):
-        pass
+    def i_frame_numbers(self, video_fn):
+        """I-frame numbers from the video index with real frame types.
+        The decoding ffprobe that reads the types runs only when the index has none yet."""
+        return iter(VideoIndex.load(video_fn, types=True).frames_of_type('I').tolist())
+
+    @staticmethod
+    def write_frames(video_fn, frame_nos, outname, writer):
+        """Write the given frames of video_fn in a single forward pass.
+
+        Frames in between are only grab()bed, so nothing is seeked and no unneeded frame is retrieved.
+        Encoding and writing happen on writer's threads while the next frames are decoded.
+
+        Args:
+            video_fn: Video path.
+            frame_nos: Ascending frame numbers, may be a lazy iterator.
+            outname: Function mapping a frame number to its output path.
+            writer: ImageWriter the frames are handed to. Flush it to see failed writes.
+
+        Yields:
+            Output path of each queued frame.
+        """
+        cap = cv2.VideoCapture(video_fn)
+        position = 0
+        try:
+            for frame_no in frame_nos:
+                while position < frame_no and cap.grab():
+                    position += 1
+                if position < frame_no or cap.grab() is False:
+                    break
+                position += 1
+                ret, frame = cap.retrieve()
+                if ret is False:
+                    break
+                writer.write(outname(frame_no), frame)
+                yield outname(frame_no)
+        finally:
+            cap.release()
+
+    def get_ipb_frmaes(self, types=False):
+        """Read frame metadata of the video without decoding pixels. See videoindex.probe_frames.
+
+        Returns:
+            List of (frame_no, pict_type, size, pts, key) in display order.
+        """
+        return probe_frames(self.path, types)
+
+    def cut_candidates(self, frames=None, spike=3.0, window=15):
+        """Find likely scene cuts from frame metadata alone.
+
+        Candidates are every keyframe after the first, because encoders insert keyframes on scene changes
+        and these cannot be told apart from the regular interval when every gap differs. Verifying a
+        regular keyframe costs only a few frames. Inter frames are candidates when their packet is `spike`
+        times larger than the median of the inter frames of the same class within `window` frames of it.
+        The class is the picture type when frames carry real P/B types, otherwise the position in the GOP
+        pattern, see gop_phases. This keeps P packets from being measured against a median of the much
+        smaller B packets.
+
+        Args:
+            frames: Output of get_ipb_frmaes. Read from the video index of self.path if None.
+            spike: Size ratio over the local median that marks a spike.
+            window: Half width of the local median window.
+
+        Returns:
+            Sorted list of candidate frame numbers.
+        """
+        if frames is None:
+            frames = VideoIndex.load(self.path).frames()
+        if not frames:
+            return []
+        sizes = np.array([x[2] for x in frames], dtype=np.float64)
+        keys = np.array([x[4] for x in frames], dtype=bool)
+        candidates = set(np.flatnonzero(keys)[1:].tolist())
+        pict_types = np.array([x[1] for x in frames])
+        if np.isin(pict_types, ['P', 'B']).any():
+            classes = pict_types
+        else:
+            classes = self.gop_phases(sizes, keys)
+        for cls in np.unique(classes[~keys]):
+            inter = np.where(~keys & (classes == cls), sizes, np.nan)
+            padded = np.pad(inter, window, constant_values=np.nan)
+            view = sliding_window_view(padded, 2 * window + 1)
+            local = np.full(len(sizes), np.nan)
+            counted = ~np.isnan(view).all(axis=1)
+            local[counted] = np.nanmedian(view[counted], axis=1)
+            with np.errstate(invalid='ignore'):
+                spikes = (classes == cls) & ~keys & (sizes > spike * local)
+            candidates.update(np.flatnonzero(spikes).tolist())
+        return sorted(candidates)
+
+    @staticmethod
+    def gop_phases(sizes, keys, max_period=8):
+        """Position of every frame in the repeating GOP pattern, for streams without picture types.
+
+        Packet headers only mark keyframes, but with B-frames the inter frame sizes repeat with the
+        pattern, e.g. one large P packet and two small B packets for IBBPBBP. The period is the
+        shortest one at which inter frames of the same GOP differ in log size nearly as little as
+        at the best period. Comparing near neighbours keeps content changes from hiding the pattern.
+
+        Args:
+            sizes: Packet sizes in display order.
+            keys: Keyframe flags in display order.
+            max_period: Longest pattern period that is tried.
+
+        Returns:
+            Integer array with the phase of each frame, counted from the last keyframe.
+        """
+        count = len(sizes)
+        last_key = np.maximum.accumulate(np.where(keys, np.arange(count), 0))
+        offset = np.arange(count) - last_key
+        log_sizes = np.log1p(sizes)
+        distances = []
+        for period in range(1, max_period + 1):
+            pairs = ~keys[period:] & ~keys[:-period] & (last_key[period:] == last_key[:-period])
+            if pairs.sum() < 2 * max_period:
+                break
+            distances.append(np.abs(log_sizes[period:] - log_sizes[:-period])[pairs].mean())
+        if not distances:
+            return np.zeros(count, dtype=np.int64)
+        period = next(p for p, value in enumerate(distances, 1) if value <= 1.1 * min(distances))
+        return offset % period
 
     def make_video_dict(self):
         pass
 
-    def rgb_to_ycbcr(self):
-        pass
+    def rgb_to_ycbcr(self, frames):
+        """Convert OpenCV BGR frames, one (H, W, 3) or a batch (N, H, W, 3), to YCbCr. See ycbcr.rgb_to_ycbcr."""
+        return rgb_to_ycbcr(frames, order='bgr')
 
     def compare_frames(self, previous_frame, current_frame):
-        pass
+        """Whether two BGR frames belong to different shots, decided by self.comparator.
+
+        Either argument may also be a batch of frames; the batches are then compared pairwise.
+
+        Returns:
+            True for a cut, or a boolean array for batches.
+        """
+        old = self.comparator.prepare(previous_frame)
+        new = self.comparator.prepare(current_frame)
+        cuts = self.comparator.compare_pairs(old, new)
+        return bool(cuts[0]) if len(cuts) == 1 and np.ndim(current_frame) == 3 else cuts
 
     def make_cut_image(self):
         pass
@@ -60,47 +205,50 @@ class Framebreaker:
     def logic(self):
         pass
 
-    def get_ipb_frames_2(self):
-        video = ffmpeg.probe(self.path)
-        time = float(video['streams'][0]['duration']) // 2
-        width = video['streams'][0]['width']
-        parts = 7
-
-        intervals = time // parts
-        intervals = int(intervals)
-        interval_list = [(i * intervals, (i + 1) * intervals) for i in range(parts)]
-        i = 0
-
-        for item in interval_list:
-            (
-                ffmpeg
-                .input(self.path, ss=item[1])
-                .filter('scale', width, -1)
-                .output('Image' + str(i) + 'jpg', vframes=1)
-                .run()
-            )
-            i += 1
-
-    # def get_frame_types(self, video_fn):
-    #     command = 'ffprobe -v error -show_entries frame=pict_type -of default=noprint_wrappers=1'.split()
-    #     out = subprocess.(command + [video_fn]).decode()
-    #     frame_types = out.replace('pict_type=', '').split()
-    #     return zip(range(len(frame_types)), frame_types)
+    def get_ipb_frames_2(self, parts=7, encode=True):
+        """Grab `parts` evenly spaced frames from the first half of the video in one ffmpeg process.
+
+        On short videos several positions can round to the same frame. Each distinct frame is decoded
+        once and used for every position that asked for it, so Image{i} is always position i.
+
+        Args:
+            parts: Number of frames to grab.
+            encode: Also write each frame as Image{i} in the format of the writer.
+
+        Returns:
+            List of BGR frames as NumPy arrays, one per position that exists in the video.
+        """
+        index = VideoIndex.load(self.path)
+        time = index.duration / 2
+        intervals = time / parts
+        frame_nos = [round((i + 1) * intervals * index.fps) for i in range(parts)]
+        wanted = sorted(set(frame_nos))
+        reader = FFmpegReader(self.path, pix_fmt='bgr24', frames=wanted)
+        decoded = dict(zip(wanted, reader))
+        reader.release()
+        writer = self.open_writer() if encode else None
+        frames = []
+        for i, frame_no in enumerate(frame_nos):
+            if frame_no not in decoded:
+                continue
+            if writer is not None:
+                writer.write('Image' + str(i) + writer.extension, decoded[frame_no])
+            frames.append(decoded[frame_no])
+        if writer is not None:
+            self.close_writer(writer)
+        return frames
 
     def save_i_keyframes(self, video_fn):
-        frame_types = self.get_frame_types(video_fn)
-        i_frames = [x[0] for x in frame_types if x[1] == 'I']
-        if i_frames:
-            basename = os.path.splitext(os.path.basename(video_fn))[0]
-            cap = cv2.VideoCapture(video_fn)
-            for frame_no in i_frames:
-                cap.set(cv2.CAP_PROP_POS_FRAMES, frame_no)
-                ret, frame = cap.read()
-                outname = basename + '_i_frame_' + str(frame_no) + '.jpg'
-                cv2.imwrite(outname, frame)
-                print('Saved: ' + outname)
-            cap.release()
-        else:
+        i_frames = self.i_frame_numbers(video_fn)
+        basename = os.path.splitext(os.path.basename(video_fn))[0]
+        writer = self.open_writer()
+        saved = False
+        for outname in self.write_frames(video_fn, i_frames, lambda n: basename + '_i_frame_' + str(n) + writer.extension,
+                                         writer):
+            print('Saved: ' + outname)
+            saved = True
+        self.close_writer(writer)
+        if saved is False:
             print('No I-frames in ' + video_fn)
 
 
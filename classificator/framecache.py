@@ -0,0 +1,117 @@
+"""**Frame Cache**
+
+On-disk cache of a video's downscaled grayscale frames, so analyses that run one after another
+on the same video decode it once and then read the frames memory-mapped at memory speed.
+Each entry is a raw uint8 file of (frames, height, width) keyed by the video's absolute path,
+mtime and analysis width. Frames are stored at a small analysis width (192 by default), and a
+video whose frames alone would exceed max_bytes is not cached at all. When the cache directory
+grows beyond max_bytes, the least recently used entries are deleted.
+
+Example:
+    cache = FrameCache(max_bytes=8 << 30) \n
+    frames = cache.load('/path/to/video.mov', width=192) \n
+    frames.shape, frames[100]
+"""
+import hashlib
+import os
+import numpy as np
+from classificator.decoder import FFmpegReader
+from classificator.videoindex import VideoIndex
+
+
+class FrameCache:
+    """Memory-mapped grayscale frames of videos.
+
+    Attributes:
+        cache_dir: Directory holding the cached frames.
+        max_bytes: Size the cache directory is trimmed to after an entry is added. Larger entries are refused.
+        width: Analysis width used when a method is called without one.
+    """
+
+    def __init__(self, cache_dir=None, max_bytes=4 << 30, width=192):
+        if cache_dir is None:
+            cache_dir = os.path.join(os.path.expanduser('~'), '.cache', 'image_processing', 'frames')
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.width = width
+
+    def cache_file(self, path, width, height):
+        """Entry location for path at width x height, including the video's mtime in its key."""
+        key = f'{os.path.abspath(path)}|{os.stat(path).st_mtime_ns}|{width}'
+        name = hashlib.sha1(key.encode()).hexdigest()
+        return os.path.join(self.cache_dir, f'{name}_{width}x{height}.u8')
+
+    def open(self, path, width=None):
+        """Return the cached frames of path as a read-only memmap of shape (N, H, W), or None."""
+        width, height = FFmpegReader.target_size(path, width or self.width)[:2]
+        cache_file = self.cache_file(path, width, height)
+        try:
+            size = os.path.getsize(cache_file)
+        except OSError:
+            return None
+        if size == 0:
+            return None
+        os.utime(cache_file)
+        return np.memmap(cache_file, dtype=np.uint8, mode='r', shape=(size // (width * height), height, width))
+
+    def build(self, path, width=None):
+        """Decode path to grayscale at width, store every frame and return them memory-mapped.
+
+        Returns:
+            The frames, or None if they would not fit in max_bytes. Nothing is stored then.
+        """
+        width = width or self.width
+        frame_width, frame_height = FFmpegReader.target_size(path, width)[:2]
+        frame_bytes = frame_width * frame_height
+        if VideoIndex.load(path).frame_count * frame_bytes > self.max_bytes:
+            return None
+        reader = FFmpegReader(path, width=width, pix_fmt='gray')
+        cache_file = self.cache_file(path, reader.width, reader.height)
+        os.makedirs(self.cache_dir, exist_ok=True)
+        temp_file = cache_file + '.tmp'
+        written = 0
+        with open(temp_file, 'wb') as fp:
+            for gray in reader:
+                written += frame_bytes
+                if written > self.max_bytes:
+                    break
+                fp.write(gray.tobytes())
+        reader.release()
+        if written > self.max_bytes:
+            os.remove(temp_file)
+            return None
+        os.replace(temp_file, cache_file)
+        self.evict(keep=cache_file)
+        return self.open(path, width)
+
+    def load(self, path, width=None):
+        """Return the cached frames of path, decoding them into the cache first if needed.
+        None if they do not fit in max_bytes, see build.
+        """
+        frames = self.open(path, width)
+        if frames is None:
+            frames = self.build(path, width)
+        return frames
+
+    def evict(self, keep=None):
+        """Delete the least recently used entries until the cache fits in max_bytes.
+
+        Args:
+            keep: Entry that is never deleted, e.g. the one just written.
+        """
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith('.u8') and entry.is_file():
+                stat = entry.stat()
+                entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, entry_path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if entry_path == keep:
+                continue
+            try:
+                os.remove(entry_path)
+            except OSError:
+                continue
+            total -= size
@@ -0,0 +1,97 @@
+"""**Frame Ring**
+
+Fixed-size ring of frames in multiprocessing shared memory, written by one decoder process and
+read by several analysis processes through NumPy views, without pickling frame data.
+
+Coordination uses int64 sequence counters stored in front of the frames:
+    counters[0]: number of frames written so far
+    counters[1]: 1 once the writer is done
+    counters[2 + i]: first frame reader i still needs
+The writer only reuses a slot when every reader has moved past the frame it holds.
+Counters are single aligned int64 writes with one writer each, so no lock is taken;
+waiting sides poll with a short sleep.
+
+Example:
+    ring = FrameRing((108, 192), slots=64, readers=2) \n
+    writer process: ring.put(frame) ... ring.close_writer() \n
+    reader process: frame = ring.get(n) ... ring.release(reader_num, n + 1) \n
+    ring.close(); ring.unlink()
+"""
+import time
+import numpy as np
+from math import prod
+from multiprocessing import shared_memory
+
+POLL = 0.0005
+
+
+class FrameRing:
+    """Shared-memory ring of uint8 frames.
+
+    Attributes:
+        shape: Shape of one frame.
+        slots: Number of frames the ring holds.
+        readers: Number of readers that release frames.
+        name: Name of the shared memory block.
+    """
+
+    def __init__(self, shape, slots=32, readers=1, name=None):
+        self.shape = tuple(shape)
+        if min(self.shape, default=1) < 1 or slots < 1:
+            raise ValueError(f'Invalid frame ring of {slots} slots of shape {self.shape}')
+        self.slots = slots
+        self.readers = readers
+        header = (2 + readers) * 8
+        size = header + slots * prod(self.shape)
+        self._owner = name is None
+        self._shm = shared_memory.SharedMemory(name=name, create=self._owner, size=size)
+        self.name = self._shm.name
+        self.counters = np.ndarray((2 + readers,), dtype=np.int64, buffer=self._shm.buf)
+        self.frames = np.ndarray((slots,) + self.shape, dtype=np.uint8, buffer=self._shm.buf, offset=header)
+        if self._owner:
+            self.counters[:] = 0
+
+    def __getstate__(self):
+        return self.shape, self.slots, self.readers, self.name
+
+    def __setstate__(self, state):
+        shape, slots, readers, name = state
+        self.__init__(shape, slots, readers, name)
+
+    def put(self, frame):
+        """Copy frame into the next slot, waiting while a reader still needs the frame it holds."""
+        seq = int(self.counters[0])
+        while seq - int(self.counters[2:].min()) >= self.slots:
+            time.sleep(POLL)
+        self.frames[seq % self.slots] = frame
+        self.counters[0] = seq + 1
+
+    def close_writer(self):
+        """Tell the readers that no more frames will be written."""
+        self.counters[1] = 1
+
+    def get(self, seq):
+        """Wait for frame seq and return a read-only view of its slot, or None after the last frame.
+        The view stays valid until the caller releases seq.
+        """
+        while int(self.counters[0]) <= seq:
+            if self.counters[1] == 1 and int(self.counters[0]) <= seq:
+                return None
+            time.sleep(POLL)
+        view = self.frames[seq % self.slots]
+        view.flags.writeable = False
+        return view
+
+    def release(self, reader, seq):
+        """Mark that reader no longer needs frames before seq."""
+        self.counters[2 + reader] = seq
+
+    def close(self):
+        """Drop the views and unmap the shared memory."""
+        del self.counters, self.frames
+        self._shm.close()
+
+    def unlink(self):
+        """Free the shared memory. Only the creating process should call this."""
+        if self._owner:
+            self._shm.unlink()
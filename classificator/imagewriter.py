@@ -0,0 +1,99 @@
+"""**Image Writer**
+
+Encodes and writes output images on a small thread pool, so the decode loop of Framebreaker and
+Thumbnailer only hands frames over instead of waiting for JPEG encoding and disk I/O.
+cv2.imencode releases the GIL, so encoding runs in parallel with decoding.
+At most `maxsize` images wait to be written; beyond that write() blocks, which keeps memory bounded.
+
+Example:
+    with ImageWriter('webp', quality=80) as writer:
+        writer.write('/path/to/frame_100' + writer.extension, frame) \n
+        failures = writer.flush() \n
+    Failures will be like:
+        [('/path/to/frame_100.webp', 'could not write file')]
+"""
+import os
+import threading
+import cv2
+from concurrent.futures import ThreadPoolExecutor
+
+FORMATS = {
+    'jpg': ('.jpg', cv2.IMWRITE_JPEG_QUALITY, 95),
+    'webp': ('.webp', cv2.IMWRITE_WEBP_QUALITY, 90),
+    'png': ('.png', cv2.IMWRITE_PNG_COMPRESSION, 3),
+}
+
+
+class ImageWriter:
+    """Asynchronous writer of images in one format.
+
+    Attributes:
+        image_format: 'jpg', 'webp' or 'png'.
+        quality: JPEG or WebP quality (0-100), or PNG compression level (0-9). None uses the format's default.
+        extension: File extension of the format, including the dot.
+    """
+
+    def __init__(self, image_format='jpg', quality=None, workers=None, maxsize=16):
+        if image_format not in FORMATS:
+            raise ValueError(f'Unsupported image format {image_format!r}, use one of {", ".join(FORMATS)}')
+        self.image_format = image_format
+        self.extension, flag, default = FORMATS[image_format]
+        self.quality = default if quality is None else quality
+        self._params = [flag, int(self.quality)]
+        self._pool = ThreadPoolExecutor(max_workers=workers or min(4, os.cpu_count() or 1))
+        self._slots = threading.BoundedSemaphore(maxsize)
+        self._lock = threading.Lock()
+        self._futures = []
+        self._failures = []
+
+    def _write(self, path, image):
+        try:
+            ret, data = cv2.imencode(self.extension, image, self._params)
+            if ret is False:
+                raise ValueError('could not encode image')
+            data.tofile(path)
+        except Exception as e:
+            with self._lock:
+                self._failures.append((path, str(e)))
+        finally:
+            self._slots.release()
+
+    def write(self, path, image):
+        """Queue image to be written to path. image must not be modified afterwards.
+        Blocks while maxsize images are still waiting.
+        """
+        self._slots.acquire()
+        future = self._pool.submit(self._write, path, image)
+        with self._lock:
+            self._futures = [f for f in self._futures if not f.done()]
+            self._futures.append(future)
+
+    def flush(self):
+        """Wait until every queued image is written.
+
+        Returns:
+            List of (path, error message) for the images that failed since the last flush.
+        """
+        with self._lock:
+            futures, self._futures = self._futures, []
+        for future in futures:
+            future.result()
+        with self._lock:
+            failures, self._failures = self._failures, []
+        return failures
+
+    def close(self):
+        """Flush and stop the threads.
+
+        Returns:
+            Failures like flush.
+        """
+        failures = self.flush()
+        self._pool.shutdown()
+        return failures
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
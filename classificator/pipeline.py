@@ -0,0 +1,348 @@
+"""**Analysis Pipeline**
+
+Decodes a video once and pushes every frame to several analysis stages: the shot detector,
+the I-frame exporter, the thumbnail writer and the frame checker.
+Each stage runs in its own thread behind a bounded queue. A slow stage makes the decoder wait
+instead of letting frames pile up in memory.
+Frames are shared by all stages and must not be modified in place.
+
+Example:
+    pipeline = Pipeline('/path/to/video.mov') \n
+    pipeline.add_stage(ShotStage(width=192)) \n
+    pipeline.add_stage(KeyframeStage('/path/to/output')) \n
+    pipeline.add_stage(ThumbnailStage(thumbnailer)) \n
+    pipeline.add_stage(CheckStage(FrameChecker([BlackCheck(), FrozenCheck()]))) \n
+    results = pipeline.run() \n
+    Results will be like:
+        {'cuts': [Cut(frame=100, time=4.000, score=41.4)], 'keyframes': [...], 'thumbnails': [...], 'checks': {...}}
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+import cv2
+from queue import Queue
+if __package__ in (None, ''):
+    # Run as `python classificator/pipeline.py` or imported from inside this directory: put the
+    # repository root first so that `classificator` is this package and not classificator.py.
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from classificator.classificator import cut_step
+from classificator.comparator import CascadeComparator
+from classificator.cuts import Cut
+from classificator.framebreaker import Framebreaker
+from classificator.imagewriter import FORMATS, ImageWriter
+from classificator.thumbnailer import Thumbnailer
+from classificator.videoindex import VideoIndex
+from frame_checker.frame_checker import BlackCheck, FlashCheck, FrameChecker, FrozenCheck, LumaRangeCheck
+
+
+class Stage:
+    """Base class of a pipeline stage.
+
+    Attributes:
+        name: Key of the stage's result.
+    """
+    name = 'stage'
+
+    def start(self, pipeline):
+        """Prepare for a video before the first frame. pipeline.cap is open and not read yet."""
+
+    def wants(self, frame_no):
+        """Whether the stage needs this frame. Frames no stage wants are not converted at all."""
+        return True
+
+    def consume(self, frame_no, frame):
+        """Process one BGR frame."""
+        raise NotImplementedError
+
+    def finish(self):
+        """Return the stage's result after the last frame."""
+        return None
+
+
+class ShotStage(Stage):
+    """Detects cuts with the same comparator and state machine as classificator.video_process.
+
+    Luma is converted from the shared BGR frames, while the detectors of classificator read ffmpeg
+    grayscale. Scores can differ by a few points, so thresholds tuned with --curve or --sweep carry
+    over only approximately.
+    """
+    name = 'cuts'
+
+    def __init__(self, comparator=None, width=None):
+        self.comparator = comparator if comparator is not None else CascadeComparator()
+        self.width = width
+        self.stack = 0
+        self.temp = None
+        self.fps = None
+        self.cuts = []
+
+    def start(self, pipeline):
+        self.comparator.reset()
+        self.fps = pipeline.fps
+        self.stack = 0
+        self.temp = None
+        self.cuts = []
+
+    def consume(self, frame_no, frame):
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        if self.width:
+            height = max(1, round(gray.shape[0] * self.width / gray.shape[1]))
+            gray = cv2.resize(gray, (self.width, height), interpolation=cv2.INTER_AREA)
+        ssim = self.comparator.push(gray)
+        if ssim is None:
+            return
+        self.stack, self.temp, cut = cut_step(self.stack, self.temp, ssim, frame_no)
+        if cut is not None:
+            self.cuts.append(Cut.from_pair(cut, self.fps))
+
+    def finish(self):
+        return self.cuts
+
+
+class KeyframeStage(Stage):
+    """Writes every keyframe of the video index, named like Framebreaker.save_i_keyframes.
+
+    The keyframes come from the cached packet flags, so no decoding ffprobe runs before the pipeline.
+    The images go through the Framebreaker's ImageWriter, or a default JPEG one owned by the stage.
+    Images that failed to write are printed by Framebreaker.close_writer and left out of the result.
+    """
+    name = 'keyframes'
+
+    def __init__(self, output, framebreaker=None):
+        self.output = output
+        self.framebreaker = framebreaker if framebreaker is not None else Framebreaker()
+        self.keyframes = set()
+        self.basename = None
+        self.writer = None
+        self.written = []
+
+    def start(self, pipeline):
+        self.keyframes = set(VideoIndex.load(pipeline.path).keyframes.tolist())
+        self.basename = os.path.splitext(os.path.basename(pipeline.path))[0]
+        self.writer = self.framebreaker.open_writer()
+        self.written = []
+
+    def wants(self, frame_no):
+        return frame_no in self.keyframes
+
+    def consume(self, frame_no, frame):
+        outname = os.path.join(self.output, self.basename + '_i_frame_' + str(frame_no) + self.writer.extension)
+        self.writer.write(outname, frame)
+        self.written.append(outname)
+
+    def finish(self):
+        failed = set(outname for outname, _ in self.framebreaker.close_writer(self.writer))
+        self.writer = None
+        return [outname for outname in self.written if outname not in failed]
+
+
+class ThumbnailStage(Stage):
+    """Writes the images Thumbnailer.execute would write for the video, from the shared frames.
+
+    Frame choice, including the scored 'best' preset and the 'fast' seek policy, sizes, output names,
+    contact sheets, image format and quality all follow the Thumbnailer. The images are written by an
+    ImageWriter on the Thumbnailer; finish raises the Thumbnailer's write error if one failed.
+    Resized frames are scaled with cv2 instead of ffmpeg, so their pixels can differ slightly.
+    """
+    name = 'thumbnails'
+
+    def __init__(self, thumbnailer):
+        self.thumbnailer = thumbnailer
+        self.frame_nums = set()
+        self.size = None
+        self.name_base = None
+        self.sheet = []
+        self.written = []
+        self._own_writer = False
+
+    def start(self, pipeline):
+        thumb = self.thumbnailer
+        index = VideoIndex.load(pipeline.path)
+        length = index.frame_count
+        if thumb.frame_list is not None:
+            frame_nums = [thumb.position_framenum(item, length) for item in thumb.frame_list]
+        else:
+            frame_nums = [thumb.get_output_framenum(None, length)]
+            if thumb.frame_preset == 'best':
+                frame_nums = [thumb.best_framenum(pipeline.path, length, frame_nums[0])]
+        frame_nums = [min(num, length - 1) for num in frame_nums]
+        if thumb.seek_policy == 'fast':
+            frame_nums = [thumb.nearest_keyframe(index.keyframes, num) for num in frame_nums]
+        self.frame_nums = set(frame_nums)
+        size = thumb.frame_size()
+        if len(size) == 2:
+            size = thumb.size_calculate(index, size)
+        self.size = (size[0] or round(index.width * size[2]), size[1] or round(index.height * size[3]))
+        self.name_base = thumb.output_name(pipeline.path)
+        self.sheet = []
+        self.written = []
+        self._own_writer = thumb.writer is None
+        if self._own_writer:
+            thumb.writer = ImageWriter(thumb.image_format, thumb.quality)
+
+    def wants(self, frame_no):
+        return frame_no in self.frame_nums
+
+    def consume(self, frame_no, frame):
+        thumb = self.thumbnailer
+        if thumb.size_change is True:
+            frame = cv2.resize(frame, dsize=self.size, interpolation=cv2.INTER_AREA)
+        extension = FORMATS[thumb.image_format][0]
+        if thumb.frame_list is None:
+            output = f'{self.name_base}_thumbnail{extension}'
+        elif thumb.sheet_columns is not None:
+            self.sheet.append(frame)
+            return
+        else:
+            output = f'{self.name_base}_thumbnail_{frame_no}{extension}'
+        thumb.save_image(output, frame)
+        self.written.append(output)
+
+    def finish(self):
+        thumb = self.thumbnailer
+        if self.sheet:
+            output = f'{self.name_base}_contact_sheet{FORMATS[thumb.image_format][0]}'
+            thumb.save_image(output, thumb.tile_frames(self.sheet, thumb.sheet_columns))
+            self.written.append(output)
+        failures = thumb.writer.close() if self._own_writer else thumb.writer.flush()
+        if self._own_writer:
+            thumb.writer = None
+        if failures:
+            thumb.error(16)
+        return self.written
+
+
+class CheckStage(Stage):
+    """Runs a FrameChecker on the luma of every frame.
+
+    The luma is recomputed from the decoded BGR frame and mapped back to limited range, so the
+    checks' thresholds mean the same as in FrameChecker.run. Super-black and super-white levels are
+    already clipped by the BGR conversion, so LumaRangeCheck cannot see them here.
+    """
+    name = 'checks'
+
+    def __init__(self, checker):
+        self.checker = checker
+        self.fps = None
+
+    def start(self, pipeline):
+        self.fps = pipeline.fps
+        self.checker.start()
+
+    def consume(self, frame_no, frame):
+        luma = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        width = self.checker.width
+        if width and luma.shape[1] > width:
+            height = max(1, round(luma.shape[0] * width / luma.shape[1]))
+            luma = cv2.resize(luma, (width, height), interpolation=cv2.INTER_AREA)
+        luma = cv2.convertScaleAbs(luma, alpha=219 / 255, beta=16)
+        self.checker.feed(frame_no, luma)
+
+    def finish(self):
+        return self.checker.report(self.fps)
+
+
+class Pipeline:
+    """Decodes one video and fans its frames out to the registered stages.
+
+    Attributes:
+        path: Video path.
+        cap: cv2.VideoCapture of the video while it runs.
+        length: Frame count reported by the container.
+        fps: Frame rate of the video.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.cap = None
+        self.length = 0
+        self.fps = 0
+        self._stages = []
+
+    def add_stage(self, stage, maxsize=8):
+        """Register a stage. At most maxsize frames wait in its queue before the decoder blocks."""
+        self._stages.append((stage, Queue(maxsize=maxsize)))
+
+    @staticmethod
+    def _work(stage, queue, errors):
+        failed = False
+        while True:
+            item = queue.get()
+            if item is None:
+                return
+            if failed is True:
+                continue
+            try:
+                stage.consume(*item)
+            except Exception as e:
+                errors[stage.name] = e
+                failed = True
+
+    def run(self):
+        """Decode the video once and feed every stage.
+
+        Returns:
+            Dict of stage name to stage result.
+
+        Raises:
+            The first exception raised by a stage, after the video is fully decoded.
+        """
+        self.cap = cv2.VideoCapture(self.path)
+        self.length = int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        self.fps = self.cap.get(cv2.CAP_PROP_FPS)
+        for stage, _ in self._stages:
+            stage.start(self)
+        errors = {}
+        threads = [threading.Thread(target=self._work, args=(stage, queue, errors), daemon=True)
+                   for stage, queue in self._stages]
+        for thread in threads:
+            thread.start()
+        frame_no = 0
+        while self.cap.grab():
+            targets = [queue for stage, queue in self._stages if stage.wants(frame_no)]
+            if targets:
+                ret, frame = self.cap.retrieve()
+                if ret is False:
+                    break
+                for queue in targets:
+                    queue.put((frame_no, frame))
+            frame_no += 1
+        for _, queue in self._stages:
+            queue.put(None)
+        for thread in threads:
+            thread.join()
+        self.cap.release()
+        if errors:
+            raise next(iter(errors.values()))
+        return {stage.name: stage.finish() for stage, _ in self._stages}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("video")
+    parser.add_argument("output")
+    parser.add_argument("--width", type=int, default=192)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    start_time = time.time()
+    thumbnailer = Thumbnailer()
+    thumbnailer.output = args.output
+    thumbnailer.frame_preset = 'middle'
+    pipeline = Pipeline(args.video)
+    pipeline.add_stage(ShotStage(width=args.width))
+    pipeline.add_stage(KeyframeStage(args.output))
+    pipeline.add_stage(ThumbnailStage(thumbnailer))
+    pipeline.add_stage(CheckStage(FrameChecker([BlackCheck(), FrozenCheck(), FlashCheck(), LumaRangeCheck()])))
+    results = pipeline.run()
+    for num, cut in enumerate(results['cuts'], 1):
+        print(f'cut : {num}, frame : {cut.frame}, time : {cut.time:.2f}s, SSIM: {cut.score:.1f}%')
+    print(f"Keyframes: {len(results['keyframes'])}, Thumbnails: {results['thumbnails']}")
+    for name, found in results['checks'].items():
+        for start, end in found:
+            print(f'{name} : {start:.2f}s - {end:.2f}s')
+    print("--- %s seconds ---" % (time.time() - start_time))
@@ -0,0 +1,160 @@
+"""**SSIM Engine**
+
+NumPy implementation of skimage.metrics.structural_similarity (default arguments, uint8 input)
+that keeps each frame's local mean and variance planes so they are computed once per frame,
+not once per pair. Stacks of frames or frame pairs are scored in one vectorized call.
+When only the side of a threshold matters, decide() scores tiles until the answer is certain.
+
+Example:
+    engine = SSIMEngine() \n
+    score = engine.push(gray) \n
+    scores = engine.score_stack(frames)   # frames: (N + 1, H, W) -> N consecutive-pair scores \n
+    score, exact = engine.decide(old, new, threshold=50)   # tiled, stops once score < 50 is settled
+"""
+import cv2
+import numpy as np
+from scipy.ndimage import uniform_filter
+
+
+class SSIMEngine:
+    """Computes SSIM from cached per-frame statistics.
+
+    Attributes:
+        win_size: Side of the square uniform window. Same default as skimage.
+        data_range: Value range of the input frames.
+    """
+
+    def __init__(self, win_size=7, data_range=255):
+        self.win_size = win_size
+        self.data_range = data_range
+        self.cov_norm = win_size ** 2 / (win_size ** 2 - 1)
+        self.c1 = (0.01 * data_range) ** 2
+        self.c2 = (0.03 * data_range) ** 2
+        self._old = None
+
+    def reset(self):
+        """Forget the previous frame, e.g. after a seek."""
+        self._old = None
+
+    def _filter(self, planes):
+        size = (1,) * (planes.ndim - 2) + (self.win_size, self.win_size)
+        return uniform_filter(planes, size=size)
+
+    def stats(self, frames):
+        """Compute (frames, mean, variance) planes for one frame (H, W) or a stack (N, H, W)."""
+        frames = np.asarray(frames, dtype=np.float64)
+        mean = self._filter(frames)
+        var = self.cov_norm * (self._filter(frames * frames) - mean * mean)
+        return frames, mean, var
+
+    def score_stats(self, old, new):
+        """SSIM between two results of stats(). Stacks are scored pairwise.
+
+        Returns:
+            Score in the range -1 to 1, or an array of N scores for stacks.
+        """
+        old_f, old_mean, old_var = old
+        new_f, new_mean, new_var = new
+        cov = self.cov_norm * (self._filter(old_f * new_f) - old_mean * new_mean)
+        ssim_map = ((2 * old_mean * new_mean + self.c1) * (2 * cov + self.c2)
+                    / ((old_mean ** 2 + new_mean ** 2 + self.c1) * (old_var + new_var + self.c2)))
+        pad = (self.win_size - 1) // 2
+        return ssim_map[..., pad:-pad, pad:-pad].mean(axis=(-2, -1))
+
+    def push(self, gray, stats=None):
+        """Score gray against the previously pushed frame, reusing that frame's cached statistics.
+
+        Args:
+            gray: Grayscale frame.
+            stats: Precomputed stats(gray), if the caller already has them.
+
+        Returns:
+            SSIM in percent, or None for the first frame.
+        """
+        new = stats if stats is not None else self.stats(gray)
+        old, self._old = self._old, new
+        if old is None:
+            return None
+        return float(self.score_stats(old, new)) * 100
+
+    def score_pairs(self, olds, news):
+        """Score N independent frame pairs given as two (N, H, W) stacks.
+
+        Returns:
+            Array of N scores in the range -1 to 1.
+        """
+        return self.score_stats(self.stats(olds), self.stats(news))
+
+    def score_stack(self, frames):
+        """Score every consecutive pair of an (N + 1, H, W) stack, computing each frame's statistics once.
+
+        Returns:
+            Array of N scores in the range -1 to 1.
+        """
+        frames, mean, var = self.stats(frames)
+        return self.score_stats((frames[:-1], mean[:-1], var[:-1]), (frames[1:], mean[1:], var[1:]))
+
+    def tile_sum(self, old, new, y0, y1, x0, x1):
+        """Sum of the SSIM map over rows y0..y1 and columns x0..x1 (exclusive) of the cropped map area.
+
+        Only the tile and a border of half a window around it are filtered, so the values equal
+        those of the full-frame map.
+        """
+        pad = (self.win_size - 1) // 2
+        old_f = np.asarray(old[y0 - pad:y1 + pad, x0 - pad:x1 + pad], dtype=np.float64)
+        new_f = np.asarray(new[y0 - pad:y1 + pad, x0 - pad:x1 + pad], dtype=np.float64)
+        old_mean, old_var = self.stats(old_f)[1:]
+        new_mean, new_var = self.stats(new_f)[1:]
+        cov = self.cov_norm * (self._filter(old_f * new_f) - old_mean * new_mean)
+        ssim_map = ((2 * old_mean * new_mean + self.c1) * (2 * cov + self.c2)
+                    / ((old_mean ** 2 + new_mean ** 2 + self.c1) * (old_var + new_var + self.c2)))
+        return ssim_map[pad:-pad, pad:-pad].sum()
+
+    def decide(self, old, new, threshold, tile=64):
+        """Decide whether the SSIM of two frames is below threshold, scoring as few tiles as possible.
+
+        The cropped SSIM map is split into tiles. Tiles whose pixels (with a border of half a window)
+        are identical score exactly 1 without being filtered. The others are scored most-different
+        first, and every map value not scored yet is bounded by -1 and 1; scoring stops as soon as
+        the bounds put the mean on one side of threshold.
+
+        Args:
+            old: Grayscale frame.
+            new: Grayscale frame of the same size.
+            threshold: SSIM in percent.
+            tile: Side of a tile.
+
+        Returns:
+            (score, exact): SSIM in percent and whether it is exact. If not, score is the bound
+            that settled the decision: the upper bound for pairs below threshold, the lower bound otherwise.
+        """
+        pad = (self.win_size - 1) // 2
+        height, width = old.shape[:2]
+        area = (height - 2 * pad) * (width - 2 * pad)
+        diff = cv2.absdiff(np.asarray(old), np.asarray(new))
+        integral = cv2.integral(diff)
+        limit = threshold / 100
+        done = 0.0
+        remaining = area
+        pending = []
+        for y0 in range(pad, height - pad, tile):
+            y1 = min(y0 + tile, height - pad)
+            for x0 in range(pad, width - pad, tile):
+                x1 = min(x0 + tile, width - pad)
+                changed = (integral[y1 + pad, x1 + pad] - integral[y0 - pad, x1 + pad]
+                           - integral[y1 + pad, x0 - pad] + integral[y0 - pad, x0 - pad])
+                size = (y1 - y0) * (x1 - x0)
+                if changed == 0:
+                    done += size
+                    remaining -= size
+                else:
+                    pending.append((changed / size, y0, y1, x0, x1, size))
+        pending.sort(reverse=True)
+        for _, y0, y1, x0, x1, size in pending:
+            if (done + remaining) / area < limit:
+                return float(done + remaining) / area * 100, False
+            if (done - remaining) / area >= limit:
+                return float(done - remaining) / area * 100, False
+            done += self.tile_sum(old, new, y0, y1, x0, x1)
+            remaining -= size
+        return float(done) / area * 100, True
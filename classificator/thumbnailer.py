@@ -17,18 +17,62 @@ Example:
     presets example:
         test.size_preset = 'quarter' \n
         test.frame_preset = 'two_third'
+    Browse thumbnails can trade frame accuracy for speed with a keyframe-based seek policy:
+        test.seek_policy = 'fast' \n
+    The 'best' preset scores candidate frames and writes the sharpest well-exposed one:
+        test.frame_preset = 'best' \n
+        test.candidates = 12 \n
+        test.candidate_window = 0.05
     Both Path must be set.\n
     path example:
         test.path = '/input/the/path/to/video.mov' \n
         or test.path = '/input/the/path/that/have/videos' \n
         test.output = '/input/the/path/to/write/thumbnails'\n
+    Several frames can be written from one decode of the video,
+    as separate images or tiled in a contact sheet:
+        test.frame_list = ['first', 'one_third', 0.5, -10] \n
+        test.sheet_columns = 2 \n
+    For a directory, videos are processed in parallel, while the directory is still being searched.
+    Subdirectories are searched if recursive is set before path; their layout is mirrored in output:
+        test.workers = 8 \n
+        test.recursive = True \n
+    Images are encoded and written in the background, as JPEG unless set otherwise:
+        test.image_format = 'webp' \n
+        test.quality = 80 \n
+    Only videos that changed since the last run, or were run with other settings, are processed again.
+    This also makes a long batch resumable, as finished videos are recorded while it runs:
+        test.incremental = True \n
     test.execute()\n
     Output image will be like:
         '/input/the/path/to/write/thumbnails/videoname_thumbnail_{frame}.jpg'
 """
+import json
 import os
+import sys
+import time
 import cv2
-from math import floor
+import numpy as np
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from math import ceil, floor
+if __package__ in (None, ''):
+    # Run as `python classificator/thumbnailer.py` or imported from inside this directory: put the
+    # repository root first so that `classificator` is this package and not classificator.py.
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from classificator.decoder import FFmpegReader
+from classificator.imagewriter import FORMATS, ImageWriter
+from classificator.videoindex import VideoIndex
+
+SEEK_GAP = 300
+SCORE_WIDTH = 160
+PROBE_WORKERS = 8
+PROBE_WINDOW = 64
+VIDEO_EXTENSIONS = ('.mov', '.mp4', '.m4v', '.mkv', '.webm', '.avi', '.mxf', '.mpg', '.mpeg', '.ts', '.m2ts',
+                    '.mts', '.flv', '.wmv', '.ogv', '.3gp', '.y4m')
+VIDEO_SIGNATURES = (b'\x1aE\xdf\xa3', b'\x00\x00\x01\xba', b'\x00\x00\x01\xb3', b'FLV',
+                    b'0&\xb2u\x8ef\xcf\x11', b'\x06\x0e+4\x02\x05\x01\x01', b'OggS', b'YUV4MPEG2')
+MANIFEST_NAME = '.thumbnail_manifest.json'
+CHECKPOINT_EVERY = 100
 
 
 class Thumbnailer:
@@ -43,9 +87,23 @@ class Thumbnailer:
         _frame_float: Position of the frame to write the thumbnail as a float number
         _path: Local path to video file or a directory
         _output: Local path to write output image(thumbnail)
+        _workers: Number of videos processed at the same time when _path leads to directory
+        _frame_list: Several frames to write from one video, as frame numbers, float positions or presets
+        _sheet_columns: Number of columns if the frames of _frame_list are tiled in one contact sheet
+        _image_format: Format of the written images
+        _quality: Quality (jpg, webp) or compression level (png) of the written images
+        _incremental: Skip videos whose thumbnails in the manifest of the output directory are current
         is_path_dir: Check whether _path leads to file or directory
         size_change: Check whether image resize is needed
-        inside_vids: List of files under _path if _path leads to directory
+        _recursive: Search subdirectories of _path for videos
+        _extensions: File extensions accepted as video without reading the file
+        _candidates: Number of frames decoded and scored for the 'best' frame preset
+        _candidate_window: Part of the video the candidates of the 'best' frame preset are spread over
+        _seek_policy: How the frame to write is reached: 'exact', 'accurate' or 'fast'
+        inside_vids: List of videos found under _path by the last execute if _path leads to directory
+        writer: ImageWriter shared by the videos of one execute call
+        frame_cache: FrameCache whose existing entries the 'best' frame preset reads candidate frames from, if set
+        seek_times: Seconds spent seeking to and decoding the written frame(s), per video path
     """
     _size = 1
     _frame = 1
@@ -54,6 +112,17 @@ class Thumbnailer:
     _frame_float = None
     _path = None
     _output = None
+    _workers = 1
+    _frame_list = None
+    _sheet_columns = None
+    _image_format = 'jpg'
+    _quality = None
+    _incremental = False
+    _recursive = False
+    _extensions = VIDEO_EXTENSIONS
+    _candidates = 8
+    _candidate_window = 0.1
+    _seek_policy = 'exact'
 
     def __init__(self):
         """
@@ -62,6 +131,9 @@ class Thumbnailer:
         self.is_path_dir = False
         self.size_change = False
         self.inside_vids = []
+        self.writer = None
+        self.frame_cache = None
+        self.seek_times = {}
 
     @property
     def path(self):
@@ -92,35 +164,109 @@ class Thumbnailer:
         self._path = path
         if os.path.isdir(path):
             self.is_path_dir = True
-            temp_list = os.listdir(path)
-            self.check_dir_files(temp_list)
+            self.check_dir_files(path)
             return
         if os.path.isfile(path):
+            self.is_path_dir = False
             return
         self.error(1)
 
-    def check_dir_files(self, temp_list):
-        """Find files in entered directory and make a list of those files. \n
-        temp_list(list): Entering a directory in path setter automatically creates a list of subfiles.
+    def check_dir_files(self, path):
+        """Check that the entered directory contains at least one video. \n
+        Subdirectories are searched only if self.recursive is set, so set it before path.
+        Only the tree up to the first video is walked; the videos themselves are found in self.execute.
 
         Args:
-            temp_list(list): Entering a directory in path setter automatically creates a list of subfiles.
-
-        Returns:
-            self.inside_vid contains every local path for each files in temp_list.
+            path(str): Local path of a directory.
 
         Raises:
-            ValueError: If there are no files in directory.
+            ValueError: If there is no video in directory, or in its subdirectories if recursive is set.
         """
-        for files in temp_list:
-            full_path = os.path.join(self.path, files)
-            if os.path.isfile(full_path) is True:
-                self.inside_vids.append(full_path)
-            else:
-                pass
-        if not self.inside_vids:
+        if next(self.find_videos(path), None) is None:
             self.error(2)
 
+    def find_videos(self, path, recursive=None):
+        """Find the videos under a directory, yielding each one as soon as it is known. \n
+        Files with one of self.extensions are accepted by name. Other files are recognised by their container
+        signature, which is read by a pool of threads while the walk goes on. Hidden files are skipped.
+
+        Args:
+            path(str): Local path of a directory.
+            recursive(bool): Whether subdirectories are searched. Default is self.recursive.
+
+        Yields:
+            Path of each video, in the order of the walk.
+        """
+        if recursive is None:
+            recursive = self.recursive
+        pending = deque()
+        with ThreadPoolExecutor(max_workers=PROBE_WORKERS) as pool:
+            for full_path, known in self.walk_files(path, recursive):
+                pending.append((full_path, None if known else pool.submit(self.has_video_signature, full_path)))
+                while pending and (pending[0][1] is None or pending[0][1].done() or len(pending) > PROBE_WINDOW):
+                    full_path, probe = pending.popleft()
+                    if probe is None or probe.result() is True:
+                        yield full_path
+            while pending:
+                full_path, probe = pending.popleft()
+                if probe is None or probe.result() is True:
+                    yield full_path
+
+    def walk_files(self, path, recursive):
+        """Walk a directory with os.scandir.
+
+        Args:
+            path(str): Local path of a directory.
+            recursive(bool): Whether subdirectories are walked.
+
+        Yields:
+            (file path, whether its extension is one of self.extensions) for every regular, non-hidden file.
+        """
+        extensions = set(ext.lower() for ext in self.extensions)
+        dirs = [path]
+        while dirs:
+            current = dirs.pop()
+            try:
+                with os.scandir(current) as scan:
+                    entries = sorted(scan, key=lambda entry: entry.name)
+            except OSError:
+                continue
+            subdirs = []
+            for entry in entries:
+                if entry.name.startswith('.'):
+                    continue
+                try:
+                    if entry.is_file():
+                        yield entry.path, os.path.splitext(entry.name)[1].lower() in extensions
+                    elif recursive and entry.is_dir(follow_symlinks=False):
+                        subdirs.append(entry.path)
+                except OSError:
+                    continue
+            dirs.extend(reversed(subdirs))
+
+    @staticmethod
+    def has_video_signature(path):
+        """Check the first bytes of a file for the signature of a video container.
+
+        Args:
+            path(str): Local path of a file.
+
+        Returns:
+            True if the file starts like an MP4/MOV, Matroska/WebM, AVI, MPEG-PS/TS, FLV, ASF, MXF or Ogg file.
+        """
+        try:
+            with open(path, 'rb') as fp:
+                head = fp.read(189)
+        except OSError:
+            return False
+        if head[4:8] in (b'ftyp', b'moov', b'mdat', b'wide', b'free'):
+            return True
+        if head[:4] == b'RIFF' and head[8:12] == b'AVI ':
+            return True
+        if len(head) == 189 and head[0] == 0x47 and head[188] == 0x47:
+            return True
+        return head.startswith(VIDEO_SIGNATURES)
+
     @property
     def output(self):
         """Set the path for writing images. \n
@@ -155,6 +301,37 @@ class Thumbnailer:
             return
         self.error(3)
 
+    @property
+    def workers(self):
+        """Set the number of videos processed at the same time when path is a directory. \n
+        num(int): Size of the worker pool. Default is 1.
+
+        Returns:
+            self.workers
+
+        Raises:
+            ValueError: If input number is not a positive integer.
+        """
+        return self._workers
+
+    @workers.setter
+    def workers(self, num):
+        """Set the number of videos processed at the same time when path is a directory.
+
+        Args:
+            num(int): Size of the worker pool. Default is 1.
+
+        Returns:
+            Set the size of the worker pool.
+
+        Raises:
+            ValueError: If input number is not a positive integer.
+        """
+        if type(num) is int and num > 0:
+            self._workers = num
+            return
+        self.error(11)
+
     @property
     def frame(self):
         """Set the frame to write thumbnail image. \n
@@ -193,7 +370,9 @@ class Thumbnailer:
         If 'last', thumbnail is last frame of the video. \n
         If 'middle', thumbnail is half frame of full frame of the video. \n
         If 'one_third', thumbnail is one third frame of full frame of the video. \n
-        If 'two_third', thumbnail is two third frame of full frame of the video.
+        If 'two_third', thumbnail is two third frame of full frame of the video. \n
+        If 'best', the sharpest well-exposed of several candidate frames around frame_float, or around the middle
+        if frame_float is not set. See self.candidates and self.candidate_window.
 
         Returns:
             self.frame_preset
@@ -212,7 +391,9 @@ class Thumbnailer:
                 If 'last', thumbnail is written with last frame of the video. \n
                 If 'middle', thumbnail is written with half of full frame of the video. \n
                 If 'one_third', thumbnail is written with one third of full frame of the video. \n
-                If 'two_third', thumbnail is written with two third of full frame of the video.
+                If 'two_third', thumbnail is written with two third of full frame of the video. \n
+                If 'best', thumbnail is written with the sharpest well-exposed of several candidate frames
+                around frame_float, or around the middle if frame_float is not set.
 
         Returns:
             self.frame_preset
@@ -223,11 +404,349 @@ class Thumbnailer:
         if type(preset) is not str:
             self.error(5)
             return
-        if preset in ['first', 'last', 'middle', 'one_third', 'two_third']:
+        if preset in ['first', 'last', 'middle', 'one_third', 'two_third', 'best']:
             self._frame_preset = preset
             return
         self.error(5)
 
+    @property
+    def frame_list(self):
+        """Set several frames to write from one video. \n
+        frames(list): Each item is an exact frame number (int), a position between 0 and 1 (float),
+            or one of the frame presets. All frames are read in one pass over the video.
+
+        Returns:
+            self.frame_list
+
+        Raises:
+            ValueError: If an item is not a frame number, a float between 0 and 1 or a frame preset.
+        """
+        return self._frame_list
+
+    @frame_list.setter
+    def frame_list(self, frames):
+        """Set several frames to write from one video.
+
+        Args:
+            frames(list): Each item is an exact frame number (int), a position between 0 and 1 (float),
+                or one of the frame presets. All frames are read in one pass over the video.
+
+        Returns:
+            self.frame_list
+
+        Raises:
+            ValueError: If an item is not a frame number, a float between 0 and 1 or a frame preset.
+        """
+        if type(frames) not in (list, tuple) or not frames:
+            self.error(12)
+            return
+        for item in frames:
+            if type(item) is int:
+                continue
+            if type(item) is float and 0 < item < 1:
+                continue
+            if item in ['first', 'last', 'middle', 'one_third', 'two_third']:
+                continue
+            self.error(12)
+            return
+        self._frame_list = list(frames)
+
+    @property
+    def sheet_columns(self):
+        """Set the number of columns to tile the frames of frame_list into one contact sheet. \n
+        columns(int): Number of columns. If not set, each frame is written as a separate image.
+
+        Returns:
+            self.sheet_columns
+
+        Raises:
+            ValueError: If input number is not a positive integer.
+        """
+        return self._sheet_columns
+
+    @sheet_columns.setter
+    def sheet_columns(self, columns):
+        """Set the number of columns to tile the frames of frame_list into one contact sheet.
+
+        Args:
+            columns(int): Number of columns. If not set, each frame is written as a separate image.
+
+        Returns:
+            self.sheet_columns
+
+        Raises:
+            ValueError: If input number is not a positive integer.
+        """
+        if type(columns) is int and columns > 0:
+            self._sheet_columns = columns
+            return
+        self.error(13)
+
+    @property
+    def image_format(self):
+        """Set the format of the written images. \n
+        image_format(str): 'jpg', 'webp' or 'png'. Default is 'jpg'.
+
+        Returns:
+            self.image_format
+
+        Raises:
+            ValueError: If input string is not a supported format.
+        """
+        return self._image_format
+
+    @image_format.setter
+    def image_format(self, image_format):
+        """Set the format of the written images.
+
+        Args:
+            image_format(str): 'jpg', 'webp' or 'png'. Default is 'jpg'.
+
+        Returns:
+            self.image_format
+
+        Raises:
+            ValueError: If input string is not a supported format.
+        """
+        if image_format in FORMATS:
+            self._image_format = image_format
+            return
+        self.error(14)
+
+    @property
+    def quality(self):
+        """Set the quality of the written images. \n
+        quality(int): 0 to 100 for 'jpg' and 'webp', PNG compression level 0 to 9 for 'png'.
+            If not set, the format's default is used.
+
+        Returns:
+            self.quality
+
+        Raises:
+            ValueError: If input number is not an integer in the range of the format.
+        """
+        return self._quality
+
+    @quality.setter
+    def quality(self, quality):
+        """Set the quality of the written images.
+
+        Args:
+            quality(int): 0 to 100 for 'jpg' and 'webp', PNG compression level 0 to 9 for 'png'.
+                If not set, the format's default is used.
+
+        Returns:
+            self.quality
+
+        Raises:
+            ValueError: If input number is not an integer in the range of the format.
+        """
+        top = 9 if self.image_format == 'png' else 100
+        if type(quality) is int and 0 <= quality <= top:
+            self._quality = quality
+            return
+        self.error(15)
+
+    @property
+    def incremental(self):
+        """Set whether only new or changed videos are processed. \n
+        flag(bool): If True, a manifest in the output directory records every source's size, mtime,
+            settings and outputs. Videos whose entry is current are skipped, outputs of deleted videos are removed.
+
+        Returns:
+            self.incremental
+
+        Raises:
+            ValueError: If input is not a bool.
+        """
+        return self._incremental
+
+    @incremental.setter
+    def incremental(self, flag):
+        """Set whether only new or changed videos are processed.
+
+        Args:
+            flag(bool): If True, a manifest in the output directory records every source's size, mtime,
+                settings and outputs. Videos whose entry is current are skipped, outputs of deleted videos are removed.
+
+        Returns:
+            self.incremental
+
+        Raises:
+            ValueError: If input is not a bool.
+        """
+        if type(flag) is bool:
+            self._incremental = flag
+            return
+        self.error(17)
+
+    @property
+    def recursive(self):
+        """Set whether videos in subdirectories of a directory path are processed. \n
+        flag(bool): If True, the whole tree under path is searched. Default is False.
+        Set it before path, which must contain a video where it is searched.
+
+        Returns:
+            self.recursive
+
+        Raises:
+            ValueError: If input is not a bool.
+        """
+        return self._recursive
+
+    @recursive.setter
+    def recursive(self, flag):
+        """Set whether videos in subdirectories of a directory path are processed.
+
+        Args:
+            flag(bool): If True, the whole tree under path is searched. Default is False.
+
+        Returns:
+            self.recursive
+
+        Raises:
+            ValueError: If input is not a bool.
+        """
+        if type(flag) is bool:
+            self._recursive = flag
+            return
+        self.error(18)
+
+    @property
+    def extensions(self):
+        """Set the file extensions that are accepted as video by name. \n
+        exts(list): Extensions like '.mov'. Files with other extensions are only processed
+            if they start with the signature of a video container.
+
+        Returns:
+            self.extensions
+
+        Raises:
+            ValueError: If an item is not a string starting with a dot.
+        """
+        return self._extensions
+
+    @extensions.setter
+    def extensions(self, exts):
+        """Set the file extensions that are accepted as video by name.
+
+        Args:
+            exts(list): Extensions like '.mov'. Files with other extensions are only processed
+                if they start with the signature of a video container.
+
+        Returns:
+            self.extensions
+
+        Raises:
+            ValueError: If an item is not a string starting with a dot.
+        """
+        if type(exts) not in (list, tuple) or not all(type(ext) is str and ext.startswith('.') for ext in exts):
+            self.error(19)
+            return
+        self._extensions = tuple(exts)
+
+    @property
+    def candidates(self):
+        """Set the number of candidate frames the 'best' frame preset decodes and scores. \n
+        num(int): Number of candidates. Default is 8.
+
+        Returns:
+            self.candidates
+
+        Raises:
+            ValueError: If input number is not a positive integer.
+        """
+        return self._candidates
+
+    @candidates.setter
+    def candidates(self, num):
+        """Set the number of candidate frames the 'best' frame preset decodes and scores.
+
+        Args:
+            num(int): Number of candidates. Default is 8.
+
+        Returns:
+            self.candidates
+
+        Raises:
+            ValueError: If input number is not a positive integer.
+        """
+        if type(num) is int and num > 0:
+            self._candidates = num
+            return
+        self.error(20)
+
+    @property
+    def candidate_window(self):
+        """Set the part of the video the candidates of the 'best' frame preset are spread over. \n
+        floatnum(float): Fraction of the video length between 0 and 1, centred on the requested position.
+            Default is 0.1.
+
+        Returns:
+            self.candidate_window
+
+        Raises:
+            ValueError: If input number is not between 0 and 1
+        """
+        return self._candidate_window
+
+    @candidate_window.setter
+    def candidate_window(self, floatnum):
+        """Set the part of the video the candidates of the 'best' frame preset are spread over.
+
+        Args:
+            floatnum(float): Fraction of the video length between 0 and 1, centred on the requested position.
+                Default is 0.1.
+
+        Returns:
+            self.candidate_window
+
+        Raises:
+            ValueError: If input number is not between 0 and 1
+        """
+        if type(floatnum) is float and 0 < floatnum <= 1:
+            self._candidate_window = floatnum
+            return
+        self.error(21)
+
+    @property
+    def seek_policy(self):
+        """Set how the frame to write is reached. \n
+        If 'exact', the frame is seeked with cv2.CAP_PROP_POS_FRAMES. This is the default. \n
+        If 'accurate', the video is seeked to the preceding keyframe of the cached video index and
+        the frames up to the requested one are grabbed. \n
+        If 'fast', the requested frame is moved to the nearest keyframe, so only one frame is decoded. \n
+        'accurate' and 'fast' take the frame count from the video index instead of the container.
+
+        Returns:
+            self.seek_policy
+
+        Raises:
+            ValueError: If input string does not match with any policy.
+        """
+        return self._seek_policy
+
+    @seek_policy.setter
+    def seek_policy(self, policy):
+        """Set how the frame to write is reached.
+
+        Args:
+            policy(str): If 'exact', the frame is seeked with cv2.CAP_PROP_POS_FRAMES. This is the default. \n
+                If 'accurate', the video is seeked to the preceding keyframe of the cached video index and
+                the frames up to the requested one are grabbed. \n
+                If 'fast', the requested frame is moved to the nearest keyframe, so only one frame is decoded.
+
+        Returns:
+            self.seek_policy
+
+        Raises:
+            ValueError: If input string does not match with any policy.
+        """
+        if policy in ['exact', 'accurate', 'fast']:
+            self._seek_policy = policy
+            return
+        self.error(22)
+
     @property
     def frame_float(self):
         """Set the position of the frame to write the thumbnail as a float number. \n
@@ -381,16 +900,14 @@ class Thumbnailer:
         The other value will be calculated from resolution of the video.
 
         Args:
-            video: Arguments that put the path into cv2.VideoCapture
+            video: VideoIndex of the video.
             frame(tuple): The first value determines the second value is horizontal or vertical.
                 Second value is fixed value. The remaining value is determined according to the resolution ratio.
 
         Returns:
             Tuple for cv2.resize. First two arguments will be the resolution of thumbnail.
         """
-        width = int(video.get(cv2.CAP_PROP_FRAME_WIDTH))
-        height = int(video.get(cv2.CAP_PROP_FRAME_HEIGHT))
-        resolution = width / height
+        resolution = video.width / video.height
         if frame[0] == 'hor':
             return round(frame[1] * resolution), frame[1], 1, 1
         elif frame[0] == 'ver':
@@ -398,56 +915,580 @@ class Thumbnailer:
 
     def execute(self):
         """Check whether multiple video thumbnails are created or a single thumbnail is created.
+        Videos in a directory are processed by a pool of self.workers threads.
+        A failing video does not stop the others; its error is recorded in the summary.
+        If incremental is set, videos whose thumbnails are still current are skipped. See self.load_manifest.
+        The manifest is saved every CHECKPOINT_EVERY finished videos and when the run is interrupted,
+        so an interrupted batch resumes where it stopped. See self.checkpoint.
 
         Returns:
-            Run self.exporting_frame(path)
+            Path of the written thumbnail if path is a video file. \n
+            If path is a directory, a summary list with one dict per video found under it, in self.inside_vids:
+            {'path': video path, 'output': thumbnail path or None, 'error': error message or None,
+            'seconds': time spent on the video, 'seek_seconds': time spent reaching and decoding the frame(s),
+            'skipped': whether the thumbnail was already current}
 
         Raises:
-            ValueError: If file in the path is not a video.
+            ValueError: If path is a single file and it is not a video, or its thumbnail could not be written.
         """
         if (self.path is None) or (self.output is None):
             self.error(9)
             return
-        if self.is_path_dir is True:
-            for vids in self.inside_vids:
-                self.exporting_frame(vids)
-        else:
-            self.exporting_frame(self.path)
+        manifest = self.load_manifest() if self.incremental is True else None
+        if manifest is not None:
+            self.prune_manifest(manifest)
+        self.writer = ImageWriter(self.image_format, self.quality, maxsize=max(16, 2 * self.workers))
+        try:
+            if self.is_path_dir is True:
+                self.inside_vids = []
+                summary = {}
+                signatures = {}
+                failures = {}
+                futures = []
+                finished = deque()
+                with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                    try:
+                        for path in self.find_videos(self.path):
+                            self.inside_vids.append(path)
+                            signatures[path] = self.signature(path)
+                            entry = manifest.get(os.path.abspath(path)) if manifest is not None else None
+                            if self.is_current(entry, signatures[path]):
+                                summary[path] = {'path': path, 'output': entry['output'], 'error': None,
+                                                 'seconds': 0.0, 'seek_seconds': 0.0, 'skipped': True}
+                            else:
+                                futures.append(pool.submit(self.timed_export, path))
+                                futures[-1].add_done_callback(finished.append)
+                            if len(finished) >= CHECKPOINT_EVERY:
+                                self.checkpoint(finished, summary, signatures, failures, manifest)
+                        for _ in as_completed(futures):
+                            if len(finished) >= CHECKPOINT_EVERY:
+                                self.checkpoint(finished, summary, signatures, failures, manifest)
+                    except BaseException:
+                        pool.shutdown(cancel_futures=True)
+                        self.checkpoint(finished, summary, signatures, failures, manifest)
+                        raise
+                self.checkpoint(finished, summary, signatures, failures, manifest)
+                if not self.inside_vids:
+                    self.error(2)
+                return [summary[path] for path in self.inside_vids]
+            signature = self.signature(self.path)
+            if manifest is not None and self.is_current(manifest.get(os.path.abspath(self.path)), signature):
+                self.save_manifest(manifest)
+                return manifest[os.path.abspath(self.path)]['output']
+            output = self.exporting_frame(self.path)
+            if self.writer.close():
+                self.error(16)
+            if manifest is not None:
+                self.record(manifest, self.path, signature, output)
+                self.save_manifest(manifest)
+            return output
+        finally:
+            self.writer.close()
+            self.writer = None
+
+    def checkpoint(self, finished, summary, signatures, failures, manifest):
+        """Wait for the images queued so far and record the videos finished since the last checkpoint. \n
+        The finished videos are taken before the flush, so every recorded video has its images written or
+        failed; a video finishing during the flush waits for the next checkpoint. With incremental set, the
+        manifest is saved, so an interrupted batch resumes with the videos that were not finished yet.
+
+        Args:
+            finished: Deque of finished futures of self.timed_export. It is emptied.
+            summary: Dict of summary dicts by video path, updated with the finished videos.
+            signatures: Dict of self.signature by video path.
+            failures: Dict of write errors by image path, updated with the failures of this flush.
+            manifest: Manifest dict, or None if incremental is not set.
+        """
+        done = []
+        while finished:
+            done.append(finished.popleft())
+        failures.update(self.writer.flush())
+        for future in done:
+            if future.cancelled():
+                continue
+            item = future.result()
+            summary[item['path']] = item
+            outputs = item['output'] if type(item['output']) is list else [item['output']]
+            failed = [failures[output] for output in outputs if output in failures]
+            if failed and item['error'] is None:
+                item['error'] = failed[0]
+            if manifest is not None:
+                self.record(manifest, item['path'], signatures[item['path']],
+                            None if item['error'] else item['output'])
+        if manifest is not None:
+            self.save_manifest(manifest)
+
+    def manifest_file(self):
+        """Path of the manifest of incremental runs. It is kept in the output directory."""
+        return os.path.join(self.output, MANIFEST_NAME)
+
+    def load_manifest(self):
+        """Read the manifest of the output directory. \n
+        It maps the absolute path of each source video to
+        {'size': bytes, 'mtime_ns': modification time, 'settings': self.settings(), 'output': written path(s)}.
+
+        Returns:
+            Manifest dict. Empty if there is no readable manifest yet.
+        """
+        try:
+            with open(self.manifest_file()) as fp:
+                return json.load(fp)
+        except (OSError, ValueError):
+            return {}
+
+    def save_manifest(self, manifest):
+        """Replace the manifest of the output directory with manifest.
+
+        Args:
+            manifest: Manifest dict. See self.load_manifest.
+        """
+        temp_file = self.manifest_file() + '.tmp'
+        with open(temp_file, 'w') as fp:
+            json.dump(manifest, fp)
+        os.replace(temp_file, self.manifest_file())
+
+    def settings(self):
+        """Settings that decide the content of a thumbnail, as stored in the manifest.
+
+        Returns:
+            Dict of the size, frame and image settings.
+        """
+        return {'size': self.size if type(self.size) is int else list(self.size), 'size_preset': self.size_preset,
+                'frame': self.frame, 'frame_preset': self.frame_preset, 'frame_float': self.frame_float,
+                'candidates': self.candidates, 'candidate_window': self.candidate_window,
+                'seek_policy': self.seek_policy,
+                'frame_list': self.frame_list, 'sheet_columns': self.sheet_columns,
+                'image_format': self.image_format, 'quality': self.quality}
+
+    @staticmethod
+    def signature(path):
+        """Size and modification time of a source video.
+
+        Args:
+            path: Path of the video.
+
+        Returns:
+            (size in bytes, mtime in nanoseconds)
+        """
+        stat = os.stat(path)
+        return stat.st_size, stat.st_mtime_ns
+
+    def is_current(self, entry, signature):
+        """Check whether a manifest entry still describes the thumbnails of the source.
+
+        Args:
+            entry: Manifest entry of the source, or None.
+            signature: Current self.signature of the source.
+
+        Returns:
+            True if the source and the settings are unchanged and every output still exists.
+        """
+        if entry is None or (entry['size'], entry['mtime_ns']) != tuple(signature):
+            return False
+        if entry['settings'] != self.settings():
+            return False
+        outputs = entry['output'] if type(entry['output']) is list else [entry['output']]
+        return all(os.path.isfile(output) for output in outputs)
+
+    def record(self, manifest, path, signature, output):
+        """Store the outputs written for a source in the manifest.
+        Outputs of a previous run that were not written again are deleted.
+
+        Args:
+            manifest: Manifest dict.
+            path: Path of the source video.
+            signature: self.signature of the source before it was processed.
+            output: Written path(s), or None if the source failed. A failed source is dropped from the manifest.
+        """
+        key = os.path.abspath(path)
+        old = manifest.pop(key, None)
+        if output is not None:
+            manifest[key] = {'size': signature[0], 'mtime_ns': signature[1], 'settings': self.settings(),
+                             'output': output}
+        if old is not None:
+            new_outputs = set(output if type(output) is list else [output])
+            self.remove_outputs(old['output'], new_outputs)
+
+    def prune_manifest(self, manifest):
+        """Drop the manifest entries of deleted sources and delete their thumbnails.
+
+        Args:
+            manifest: Manifest dict.
+        """
+        for key in [key for key in manifest if not os.path.isfile(key)]:
+            self.remove_outputs(manifest.pop(key)['output'])
+
+    @staticmethod
+    def remove_outputs(outputs, keep=()):
+        """Delete written thumbnails.
+
+        Args:
+            outputs: Path or list of paths.
+            keep: Paths that are not deleted.
+        """
+        for output in outputs if type(outputs) is list else [outputs]:
+            if output in keep:
+                continue
+            try:
+                os.remove(output)
+            except OSError:
+                pass
+
+    def timed_export(self, path):
+        """Run self.exporting_frame(path), catching its error and measuring its time.
+
+        Args:
+            path: Path to execute.
+
+        Returns:
+            Summary dict of the video. See self.execute.
+        """
+        start = time.perf_counter()
+        output = None
+        err = None
+        try:
+            output = self.exporting_frame(path)
+        except Exception as e:
+            err = str(e)
+        return {'path': path, 'output': output, 'error': err, 'seconds': time.perf_counter() - start,
+                'seek_seconds': self.seek_times.get(path), 'skipped': False}
 
     def exporting_frame(self, path):
         """Make thumbnail(s) from path.
+        If frame_list is set, self.exporting_frames(path) is executed instead.
+        If the thumbnail is resized, the frame is decoded by ffmpeg directly at the thumbnail size.
+        The frame is reached according to self.seek_policy; the time it takes is stored in self.seek_times.
 
         Args:
             path: Path to execute.
 
         Returns:
-            Output thumbnail image(s)
+            Path of the written thumbnail image.
         """
+        if self.frame_list is not None:
+            return self.exporting_frames(path)
         video_file = cv2.VideoCapture(path)
-        frame_num = self.get_output_framenum(video_file)
+        index = None
+        keyframes = None
+        length = 0
+        if video_file.isOpened():
+            index = VideoIndex.load(path)
+            length = index.frame_count
+            if self.seek_policy != 'exact':
+                keyframes = index.keyframes
+        frame_num = self.get_output_framenum(video_file, length)
+        if self.frame_preset == 'best' and video_file.isOpened():
+            frame_num = self.best_framenum(path, length, frame_num)
+        if self.seek_policy == 'fast' and keyframes is not None:
+            frame_num = self.nearest_keyframe(keyframes, frame_num)
         size = self.frame_size()
-        name = os.path.basename(path)[:-4]
-        video_file.set(cv2.CAP_PROP_POS_FRAMES, frame_num)
-        ret, frame = video_file.read()
+        name = self.output_name(path)
+        if self.size_change is True and index is not None:
+            if len(size) == 2:
+                size = self.size_calculate(index, size)
+            width = size[0] or round(index.width * size[2])
+            height = size[1] or round(index.height * size[3])
+            start = time.perf_counter()
+            reader = FFmpegReader(path, width, height, pix_fmt='bgr24', start_frame=frame_num)
+            ret, frame = reader.read()
+            reader.release()
+        elif self.seek_policy == 'accurate' and keyframes is not None:
+            start = time.perf_counter()
+            ret, frame = self.read_from_keyframe(video_file, keyframes, frame_num)
+        else:
+            start = time.perf_counter()
+            video_file.set(cv2.CAP_PROP_POS_FRAMES, frame_num)
+            ret, frame = video_file.read()
+        self.seek_times[path] = time.perf_counter() - start
+        video_file.release()
         if ret is False:
             self.error(10)
             return
+        output = f'{name}_thumbnail{FORMATS[self.image_format][0]}'
+        self.save_image(output, frame)
+        return output
+
+    def exporting_frames(self, path):
+        """Make thumbnails for every item of frame_list from one pass over the video.
+        If sheet_columns is set, the thumbnails are tiled into one contact sheet.
+
+        Args:
+            path: Path to execute.
+
+        Returns:
+            List of written image paths.
+        """
+        video_file = cv2.VideoCapture(path)
+        index = None
+        keyframes = None
+        length = 0
+        if video_file.isOpened():
+            index = VideoIndex.load(path)
+            length = index.frame_count
+            if self.seek_policy != 'exact':
+                keyframes = index.keyframes
+        frame_nums = set(min(self.position_framenum(item, length), length - 1) for item in self.frame_list)
+        if self.seek_policy == 'fast' and keyframes is not None:
+            frame_nums = set(self.nearest_keyframe(keyframes, num) for num in frame_nums)
+        start = time.perf_counter()
+        frames = self.read_frames(video_file, sorted(frame_nums), keyframes)
+        self.seek_times[path] = time.perf_counter() - start
+        if not frames:
+            video_file.release()
+            self.error(10)
+            return
+        video_file.release()
+        size = self.frame_size()
         if len(size) == 2:
-            size = self.size_calculate(video_file, size)
+            size = self.size_calculate(index, size)
         if self.size_change is True:
-            frame = cv2.resize(frame, dsize=(size[0], size[1]), fx=size[2], fy=size[3], interpolation=cv2.INTER_AREA)
-        cv2.imwrite(os.path.join(self.output, f'{name}_thumbnail.jpg'), frame)
+            frames = [(num, cv2.resize(frame, dsize=(size[0], size[1]), fx=size[2], fy=size[3],
+                                       interpolation=cv2.INTER_AREA)) for num, frame in frames]
+        name = self.output_name(path)
+        if self.sheet_columns is not None:
+            output = f'{name}_contact_sheet{FORMATS[self.image_format][0]}'
+            self.save_image(output, self.tile_frames([frame for _, frame in frames], self.sheet_columns))
+            return [output]
+        outputs = []
+        for num, frame in frames:
+            output = f'{name}_thumbnail_{num}{FORMATS[self.image_format][0]}'
+            self.save_image(output, frame)
+            outputs.append(output)
+        return outputs
+
+    def output_name(self, path):
+        """Output path of a video's images, without the suffix that tells them apart. \n
+        For a directory path, the video's subdirectory under self.path is mirrored under self.output,
+        so videos with the same name in different subdirectories do not overwrite each other's images.
+
+        Args:
+            path: Path of the video.
+
+        Returns:
+            self.output joined with the relative subdirectory and the video's name without extension.
+        """
+        name = os.path.splitext(os.path.basename(path))[0]
+        if self.is_path_dir is not True:
+            return os.path.join(self.output, name)
+        output_dir = os.path.normpath(os.path.join(self.output, os.path.relpath(os.path.dirname(path), self.path)))
+        os.makedirs(output_dir, exist_ok=True)
+        return os.path.join(output_dir, name)
+
+    def save_image(self, output, image):
+        """Hand an image to self.writer, which encodes and writes it in the background.
+        Outside of execute, the image is written before this method returns.
+
+        Args:
+            output: Path of the image file.
+            image: Image to write.
+
+        Raises:
+            ValueError: If the image is written immediately and it fails.
+        """
+        if self.writer is not None:
+            self.writer.write(output, image)
+            return
+        writer = ImageWriter(self.image_format, self.quality, workers=1)
+        writer.write(output, image)
+        if writer.close():
+            self.error(16)
+
+    @staticmethod
+    def read_frames(video_file, frame_nums, keyframes=None):
+        """Read the given frames in one forward pass.
+        Frames in between are skipped with grab(), which does not convert them.
+        The video is only seeked when the next frame is more than SEEK_GAP frames ahead.
+
+        Args:
+            video_file: cv2.VideoCapture of the video.
+            frame_nums: Frame numbers in ascending order.
+            keyframes: Keyframe numbers in ascending order. If given, seeks land on the keyframe
+                before the frame and the rest is grabbed.
+
+        Returns:
+            List of (frame number, frame) for every frame that could be read.
+        """
+        frames = []
+        position = 0
+        for num in frame_nums:
+            if num - position > SEEK_GAP:
+                if keyframes is not None and len(keyframes):
+                    target = int(keyframes[max(0, np.searchsorted(keyframes, num, side='right') - 1)])
+                else:
+                    target = num
+                if target > position:
+                    video_file.set(cv2.CAP_PROP_POS_FRAMES, target)
+                    position = target
+            while position < num and video_file.grab():
+                position += 1
+            ret, frame = video_file.read()
+            if ret is False:
+                break
+            position += 1
+            frames.append((num, frame))
+        return frames
+
+    @staticmethod
+    def nearest_keyframe(keyframes, frame_num):
+        """Move a frame number to the nearest keyframe.
+
+        Args:
+            keyframes: Keyframe numbers in ascending order.
+            frame_num: Requested frame number.
+
+        Returns:
+            Nearest keyframe number, or frame_num if there are no keyframes.
+        """
+        if len(keyframes) == 0:
+            return frame_num
+        pos = np.searchsorted(keyframes, frame_num)
+        near = keyframes[max(0, pos - 1):pos + 1]
+        return int(near[np.argmin(np.abs(near - frame_num))])
+
+    @staticmethod
+    def read_from_keyframe(video_file, keyframes, frame_num):
+        """Seek to the keyframe before frame_num and grab() forward to it.
+
+        Args:
+            video_file: cv2.VideoCapture of the video.
+            keyframes: Keyframe numbers in ascending order.
+            frame_num: Frame number to read.
+
+        Returns:
+            (ret, frame) like cv2.VideoCapture.read.
+        """
+        pos = np.searchsorted(keyframes, frame_num, side='right') - 1
+        position = int(keyframes[pos]) if pos >= 0 else 0
+        video_file.set(cv2.CAP_PROP_POS_FRAMES, position)
+        while position < frame_num and video_file.grab():
+            position += 1
+        return video_file.read()
+
+    @staticmethod
+    def tile_frames(frames, columns):
+        """Tile frames of the same size into a grid. Empty cells of the last row are black.
 
-    def get_output_framenum(self, vid_file):
+        Args:
+            frames: List of images.
+            columns: Number of columns.
+
+        Returns:
+            Contact sheet image.
+        """
+        rows = ceil(len(frames) / columns)
+        blank = np.zeros_like(frames[0])
+        cells = frames + [blank] * (rows * columns - len(frames))
+        return np.vstack([np.hstack(cells[row * columns:(row + 1) * columns]) for row in range(rows)])
+
+    def position_framenum(self, position, length):
+        """Calculate the exact frame number of one item of frame_list.
+
+        Args:
+            position: Frame number, float position or frame preset.
+            length: Total number of frames in video
+
+        Returns:
+            Exact frame number to write thumbnail.
+        """
+        if position == 'first':
+            return 1
+        if position == 'last':
+            return length
+        if position == 'middle':
+            return length // 2
+        if position == 'one_third':
+            return length // 3
+        if position == 'two_third':
+            return (length // 3) * 2
+        if type(position) is float:
+            return max(1, int(floor(position * length)))
+        if position < 0:
+            return max(0, length + position)
+        return min(position, length)
+
+    def best_center(self, length):
+        """Calculate the frame the candidates of the 'best' frame preset are centred on.
+
+        Args:
+            length: Total number of frames in video
+
+        Returns:
+            Frame number at frame_float, or the middle frame if frame_float is not set.
+        """
+        if self.frame_float is not None:
+            return max(1, int(floor(self.frame_float * length)))
+        return length // 2
+
+    def best_framenum(self, path, length, center):
+        """Choose the frame to write for the 'best' frame preset. \n
+        self.candidates frames, spread over self.candidate_window of the video around center, are decoded as
+        small grayscale frames in one ffmpeg process, and scored together with self.score_frames. If
+        self.frame_cache already holds the video at its own width, the candidates are read from that entry
+        instead. No cache entry is built here, since that would decode every frame of the video.
+
+        Args:
+            path: Path of the video.
+            length: Total number of frames in video
+            center: Frame number the candidates are centred on.
+
+        Returns:
+            Frame number of the best candidate.
+        """
+        half = max(1, round(length * self.candidate_window / 2))
+        first = max(0, center - half)
+        last = max(first, min(length - 1, center + half))
+        frame_nums = sorted(set(np.linspace(first, last, self.candidates).round().astype(int).tolist()))
+        frames = self.frame_cache.open(path) if self.frame_cache is not None else None
+        if frames is not None:
+            frame_nums = [num for num in frame_nums if num < len(frames)]
+            grays = frames[frame_nums]
+        else:
+            reader = FFmpegReader(path, SCORE_WIDTH, pix_fmt='gray', start_frame=first,
+                                  frames=[num - first for num in frame_nums])
+            grays = np.array(list(reader))
+            reader.release()
+            frame_nums = frame_nums[:len(grays)]
+        if len(grays) == 0:
+            return center
+        return frame_nums[int(np.argmax(self.score_frames(grays)))]
+
+    @staticmethod
+    def score_frames(grays):
+        """Score candidate thumbnails in one vectorized pass. \n
+        Sharpness is the variance of the Laplacian, contrast the standard deviation and exposure the distance of
+        the mean from mid-grey. Sharpness and contrast are relative to the best candidate. Nearly black, nearly
+        white and flat frames score below every other candidate.
+
+        Args:
+            grays: Stack of small grayscale frames (N, H, W).
+
+        Returns:
+            Array of N scores. The highest is the best frame.
+        """
+        frames = grays.astype(np.float32)
+        laplacian = (frames[:, :-2, 1:-1] + frames[:, 2:, 1:-1] + frames[:, 1:-1, :-2] + frames[:, 1:-1, 2:]
+                     - 4 * frames[:, 1:-1, 1:-1])
+        sharpness = laplacian.var(axis=(1, 2))
+        brightness = frames.mean(axis=(1, 2))
+        contrast = frames.std(axis=(1, 2))
+        score = (0.5 * sharpness / max(float(sharpness.max()), 1e-6)
+                 + 0.3 * contrast / max(float(contrast.max()), 1e-6)
+                 + 0.2 * (1 - np.abs(brightness - 128) / 128))
+        unusable = (brightness < 16) | (brightness > 240) | (contrast < 4)
+        return score - unusable
+
+    def get_output_framenum(self, vid_file, length=None):
         """Calculate the exact frame number to write.
 
         Args:
             vid_file: Video file to check its total number of frames.
+            length: Total number of frames, if known better than the container reports it.
 
         Returns:
             Exact frame number to write thumbnail.
         """
-        length = int(vid_file.get(cv2.CAP_PROP_FRAME_COUNT))
+        if length is None:
+            length = int(vid_file.get(cv2.CAP_PROP_FRAME_COUNT))
         if self.frame_preset == 'first':
             return 1
         if self.frame_preset == 'last':
@@ -458,6 +1499,8 @@ class Thumbnailer:
             return length // 3
         if self.frame_preset == 'two_third':
             return (length // 3) * 2
+        if self.frame_preset == 'best':
+            return self.best_center(length)
         if type(self.frame) is float:
             return self.float_framenum(length)
         if type(self.frame) is int:
@@ -510,13 +1553,14 @@ class Thumbnailer:
                              "or a directory that contains video.")
         if err_num == 2:
             raise ValueError("Path Setting Error : This path does not contain video. "
-                             "You must set video file or directory as path.")
+                             "You must set video file or directory as path. "
+                             "To search its subdirectories, set recursive to True before path.")
         if err_num == 3:
             raise ValueError("Path Setting Error : Output must be an existing directory.")
         if err_num == 4:
             raise ValueError("Input Error : Frame must be an integer.")
         if err_num == 5:
-            raise ValueError("Input Error : Presets for frame are first, last, middle, one_third, two_third. "
+            raise ValueError("Input Error : Presets for frame are first, last, middle, one_third, two_third, best. "
                              "Other strings aren't supported.")
         if err_num == 6:
             raise ValueError("Input Error : Calculating the frame position requires float number between 0 and 1")
@@ -530,6 +1574,33 @@ class Thumbnailer:
         if err_num == 10:
             raise ValueError("Path Setting Error : This path is not a video file path. "
                              "You must set video file path as path.")
+        if err_num == 11:
+            raise ValueError("Input Error : Workers must be a positive integer.")
+        if err_num == 12:
+            raise ValueError("Input Error : Frame list must be a list of frame numbers, "
+                             "float numbers between 0 and 1, or frame presets.")
+        if err_num == 13:
+            raise ValueError("Input Error : Sheet columns must be a positive integer.")
+        if err_num == 14:
+            raise ValueError("Input Error : Image formats are jpg, webp, png. "
+                             "Other strings aren't supported.")
+        if err_num == 15:
+            raise ValueError("Input Error : Quality must be an integer from 0 to 100, or from 0 to 9 for png.")
+        if err_num == 16:
+            raise ValueError("Output Error : Thumbnail image could not be written to the output path.")
+        if err_num == 17:
+            raise ValueError("Input Error : Incremental must be True or False.")
+        if err_num == 18:
+            raise ValueError("Input Error : Recursive must be True or False.")
+        if err_num == 19:
+            raise ValueError("Input Error : Extensions must be a list of strings like '.mov'.")
+        if err_num == 20:
+            raise ValueError("Input Error : Candidates must be a positive integer.")
+        if err_num == 21:
+            raise ValueError("Input Error : Candidate window requires float number between 0 and 1")
+        if err_num == 22:
+            raise ValueError("Input Error : Seek policies are exact, accurate, fast. "
+                             "Other strings aren't supported.")
 
 
 # def main():
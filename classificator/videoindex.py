@@ -0,0 +1,194 @@
+"""**Video Index**
+
+Per-video on-disk index of the facts every module asks the container for: frame count, fps,
+resolution, frame types, pts and keyframe positions.
+The index is built once with ffprobe, stored under VideoIndex.cache_dir as an .npz keyed by the
+video's absolute path, and rebuilt automatically when the video's size or mtime changes.
+Arrays are only read from disk when they are first accessed.
+
+Example:
+    index = VideoIndex.load('/path/to/video.mov') \n
+    index.frame_count, index.fps, index.width, index.height \n
+    index.keyframes, index.keyframe_pts \n
+    index.frames_of_type('I')
+"""
+import hashlib
+import os
+import subprocess
+import cv2
+import numpy as np
+
+
+def probe_frames(path, types=False):
+    """Read frame metadata of the first video stream without decoding pixels.
+
+    By default only packet headers are read, so pict_type is 'I' for keyframes and '?' otherwise.
+    With types=True ffprobe reports the real I/P/B type, which makes it run the decoder.
+    ffprobe's output is parsed line by line as it arrives, so it is never held in memory as a whole.
+
+    Returns:
+        List of (frame_no, pict_type, size, pts, key) in display order.
+
+    Raises:
+        subprocess.CalledProcessError: If ffprobe fails.
+    """
+    if types:
+        entries = 'frame=key_frame,pts_time,pkt_size,pict_type'
+    else:
+        entries = 'packet=pts_time,size,flags'
+    command = ['ffprobe', '-v', 'error', '-select_streams', 'v:0', '-show_entries', entries,
+               '-of', 'compact=p=0', path]
+    frames = []
+    with subprocess.Popen(command, stdout=subprocess.PIPE) as proc:
+        for line in proc.stdout:
+            fields = dict(x.split('=', 1) for x in line.decode().strip().split('|') if '=' in x)
+            if not fields:
+                continue
+            key = 'K' in fields.get('flags', '') or fields.get('key_frame') == '1'
+            pts = fields.get('pts_time', 'N/A')
+            size = fields.get('size', fields.get('pkt_size', 'N/A'))
+            frames.append((fields.get('pict_type', 'I' if key else '?'),
+                           int(size) if size != 'N/A' else 0,
+                           float(pts) if pts != 'N/A' else None,
+                           key))
+    if proc.returncode != 0:
+        raise subprocess.CalledProcessError(proc.returncode, command)
+    if all(x[2] is not None for x in frames):
+        frames.sort(key=lambda x: x[2])
+    return [(n,) + x for n, x in enumerate(frames)]
+
+
+class VideoIndex:
+    """Cached container facts for one video.
+
+    Attributes:
+        cache_dir: Directory holding the index files of every video.
+        path: Video path the index describes.
+    """
+    cache_dir = os.path.join(os.path.expanduser('~'), '.cache', 'image_processing', 'index')
+
+    def __init__(self, path, data):
+        self.path = path
+        self._data = data
+        self._arrays = {}
+
+    def _array(self, name):
+        if name not in self._arrays:
+            self._arrays[name] = self._data[name]
+        return self._arrays[name]
+
+    @classmethod
+    def index_file(cls, path):
+        """Index file location for a video path."""
+        name = hashlib.sha1(os.path.abspath(path).encode()).hexdigest()
+        return os.path.join(cls.cache_dir, name + '.npz')
+
+    @staticmethod
+    def signature(path):
+        """(size, mtime_ns) of the video; the index is valid only while this matches."""
+        stat = os.stat(path)
+        return np.array([stat.st_size, stat.st_mtime_ns], dtype=np.int64)
+
+    @classmethod
+    def cached(cls, path, types=False):
+        """Return the stored index if it is still current, otherwise None.
+
+        Args:
+            types: Also require real I/P/B frame types, not just keyframe flags.
+        """
+        try:
+            data = np.load(cls.index_file(path))
+        except (OSError, ValueError):
+            return None
+        if not np.array_equal(data['signature'], cls.signature(path)) or (types and not data['types']):
+            data.close()
+            return None
+        return cls(path, data)
+
+    @classmethod
+    def build(cls, path, types=False):
+        """Probe the video, store its index and return it."""
+        frames = probe_frames(path, types)
+        cap = cv2.VideoCapture(path)
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        cap.release()
+        data = {
+            'signature': cls.signature(path),
+            'types': np.array(types),
+            'fps': np.array(fps, dtype=np.float64),
+            'resolution': np.array([width, height], dtype=np.int32),
+            'pict_types': np.array([x[1] for x in frames], dtype='S1'),
+            'sizes': np.array([x[2] for x in frames], dtype=np.int64),
+            'pts': np.array([np.nan if x[3] is None else x[3] for x in frames], dtype=np.float64),
+            'keys': np.array([x[4] for x in frames], dtype=bool),
+        }
+        index_file = cls.index_file(path)
+        os.makedirs(cls.cache_dir, exist_ok=True)
+        temp_file = index_file[:-4] + '.tmp.npz'
+        np.savez(temp_file, **data)
+        os.replace(temp_file, index_file)
+        return cls(path, data)
+
+    @classmethod
+    def load(cls, path, types=False):
+        """Return the stored index, building it first if it is missing or outdated."""
+        index = cls.cached(path, types)
+        if index is None:
+            index = cls.build(path, types)
+        return index
+
+    @property
+    def frame_count(self):
+        return len(self._array('keys'))
+
+    @property
+    def fps(self):
+        return float(self._array('fps'))
+
+    @property
+    def width(self):
+        return int(self._array('resolution')[0])
+
+    @property
+    def height(self):
+        return int(self._array('resolution')[1])
+
+    @property
+    def duration(self):
+        """Duration in seconds, from the last pts when available."""
+        pts = self.pts
+        if len(pts) and not np.isnan(pts[-1]):
+            return float(pts[-1] - pts[0]) + (1 / self.fps if self.fps else 0)
+        return self.frame_count / self.fps if self.fps else 0.0
+
+    @property
+    def pts(self):
+        return self._array('pts')
+
+    @property
+    def sizes(self):
+        return self._array('sizes')
+
+    @property
+    def keyframes(self):
+        """Frame numbers of the keyframes."""
+        return np.flatnonzero(self._array('keys'))
+
+    @property
+    def keyframe_pts(self):
+        return self.pts[self.keyframes]
+
+    @property
+    def pict_types(self):
+        return self._array('pict_types')
+
+    def frames_of_type(self, pict_type):
+        """Frame numbers whose picture type is pict_type ('I', 'P' or 'B')."""
+        return np.flatnonzero(self.pict_types == pict_type.encode())
+
+    def frames(self):
+        """Rows in the same form as probe_frames."""
+        return [(n, t.decode(), int(s), None if np.isnan(p) else float(p), bool(k))
+                for n, (t, s, p, k) in enumerate(zip(self.pict_types, self.sizes, self.pts, self._array('keys')))]
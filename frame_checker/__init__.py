@@ -0,0 +1,7 @@
+"""**Frame Checker**
+
+Per-frame quality checks of video files, built on the classificator decoder.
+Run the checker from the repository root, as a module or as a script:
+    python -m frame_checker.frame_checker /path/to/video.mov \n
+    python frame_checker/frame_checker.py /path/to/video.mov
+"""
@@ -0,0 +1,211 @@
+"""**Frame Checker**
+
+This module runs quality checks on every frame of a video in one decode pass.
+Each frame is decoded once, downscaled and reduced to its luma plane inside ffmpeg,
+and the same frame is handed to every registered check.
+Adding a check adds its arithmetic, not another decode.
+
+Example:
+    checker = FrameChecker() \n
+    checker.add_check(BlackCheck()) \n
+    checker.add_check(FrozenCheck(min_frames=12)) \n
+    report = checker.run('/path/to/video.mov') \n
+    Report will be like:
+        {'black': [(0.0, 1.2)], 'frozen': [(30.5, 32.0)]}
+    Ranges are (start second, end second) of consecutive flagged frames.
+"""
+import argparse
+import os
+import sys
+import time
+import numpy as np
+if __package__ in (None, ''):
+    # Run as `python frame_checker/frame_checker.py`: put the repository root first so that the
+    # classificator package is importable from here.
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from classificator.decoder import FFmpegReader
+from classificator.similarity import SSIMEngine
+
+
+class Check:
+    """Base class of a per-frame check.
+
+    Attributes:
+        name: Key of the check in the report.
+        min_frames: Shortest run of flagged frames that is reported.
+    """
+    name = 'check'
+
+    def __init__(self, min_frames=1):
+        self.min_frames = min_frames
+
+    def reset(self):
+        """Forget any state kept from previous frames."""
+
+    def flag(self, frame_no, luma, mean):
+        """Decide whether a frame fails the check.
+
+        Args:
+            frame_no: Number of the current frame.
+            luma: Downscaled luma plane of the current frame (uint8, limited range for YUV sources).
+            mean: Mean of luma, computed once for all checks.
+
+        Returns:
+            Number of the flagged frame, or None. Checks that need the next frame to decide
+            may flag an earlier frame.
+        """
+        raise NotImplementedError
+
+
+class BlackCheck(Check):
+    """Flags frames where at least `ratio` of the pixels are at or below `threshold`."""
+    name = 'black'
+
+    def __init__(self, threshold=32, ratio=0.98, min_frames=1):
+        super().__init__(min_frames)
+        self.threshold = threshold
+        self.ratio = ratio
+
+    def flag(self, frame_no, luma, mean):
+        if np.count_nonzero(luma <= self.threshold) >= self.ratio * luma.size:
+            return frame_no
+        return None
+
+
+class FrozenCheck(Check):
+    """Flags frames whose SSIM to the previous frame is at least `threshold` percent."""
+    name = 'frozen'
+
+    def __init__(self, threshold=99.5, min_frames=2):
+        super().__init__(min_frames)
+        self.threshold = threshold
+        self.engine = SSIMEngine()
+
+    def reset(self):
+        self.engine.reset()
+
+    def flag(self, frame_no, luma, mean):
+        score = self.engine.push(luma)
+        if score is not None and score >= self.threshold:
+            return frame_no
+        return None
+
+
+class FlashCheck(Check):
+    """Flags a frame whose mean luma is more than `delta` above both of its neighbours.
+    The decision needs the next frame, so the flag is one frame late.
+    """
+    name = 'flash'
+
+    def __init__(self, delta=40, min_frames=1):
+        super().__init__(min_frames)
+        self.delta = delta
+        self._means = []
+
+    def reset(self):
+        self._means = []
+
+    def flag(self, frame_no, luma, mean):
+        self._means = self._means[-2:] + [mean]
+        if len(self._means) < 3:
+            return None
+        before, current, after = self._means
+        if current - before > self.delta and current - after > self.delta:
+            return frame_no - 1
+        return None
+
+
+class LumaRangeCheck(Check):
+    """Flags frames where more than `ratio` of the pixels are outside the legal luma range."""
+    name = 'luma_range'
+
+    def __init__(self, low=16, high=235, ratio=0.01, min_frames=1):
+        super().__init__(min_frames)
+        self.low = low
+        self.high = high
+        self.ratio = ratio
+
+    def flag(self, frame_no, luma, mean):
+        if np.count_nonzero((luma < self.low) | (luma > self.high)) > self.ratio * luma.size:
+            return frame_no
+        return None
+
+
+class FrameChecker:
+    """Runs every registered check over one shared decode of a video.
+
+    Attributes:
+        checks: Registered checks.
+        width: Width the frames are downscaled to before checking.
+    """
+
+    def __init__(self, checks=None, width=256):
+        self.checks = list(checks) if checks is not None else []
+        self.width = width
+        self._ranges = {}
+
+    def add_check(self, check):
+        """Register a check. Its name must be unique."""
+        self.checks.append(check)
+
+    def start(self):
+        """Reset every check before the first frame of a video."""
+        self._ranges = {check.name: [] for check in self.checks}
+        for check in self.checks:
+            check.reset()
+
+    def feed(self, frame_no, luma):
+        """Run every check on one downscaled luma plane."""
+        mean = float(luma.mean())
+        for check in self.checks:
+            flagged = check.flag(frame_no, luma, mean)
+            if flagged is None:
+                continue
+            runs = self._ranges[check.name]
+            if runs and flagged <= runs[-1][1] + 1:
+                runs[-1][1] = max(runs[-1][1], flagged)
+            else:
+                runs.append([flagged, flagged])
+
+    def report(self, fps):
+        """Collect the flagged runs of every check since start().
+
+        Returns:
+            Dict of check name to a list of (start second, end second) ranges.
+        """
+        fps = fps or 1
+        report = {}
+        for check in self.checks:
+            report[check.name] = [(start / fps, (end + 1) / fps) for start, end in self._ranges[check.name]
+                                  if end - start + 1 >= check.min_frames]
+        return report
+
+    def run(self, path):
+        """Check every frame of path.
+
+        Returns:
+            Dict of check name to a list of (start second, end second) ranges.
+        """
+        reader = FFmpegReader(path, width=self.width, pix_fmt='y')
+        self.start()
+        for frame_no, luma in enumerate(reader):
+            self.feed(frame_no, luma)
+        reader.release()
+        return self.report(reader.fps)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("video")
+    parser.add_argument("--width", type=int, default=256)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    start_time = time.time()
+    checker = FrameChecker([BlackCheck(), FrozenCheck(), FlashCheck(), LumaRangeCheck()], args.width)
+    for name, found in checker.run(args.video).items():
+        for start, end in found:
+            print(f'{name} : {start:.2f}s - {end:.2f}s')
+    print("--- %s seconds ---" % (time.time() - start_time))
@@ -0,0 +1,55 @@
+import os
+import shutil
+import subprocess
+import sys
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def encode_clip(path, keyint):
+    """Encode 250 frames at 25 fps with cuts at frames 100 and 175."""
+    sources = ['testsrc=s=192x144:r=25:d=4', 'mandelbrot=s=192x144:r=25', 'smptebars=s=192x144:r=25']
+    command = ['ffmpeg', '-v', 'error', '-y']
+    for source in sources:
+        command += ['-f', 'lavfi', '-i', source]
+    command += ['-filter_complex',
+                '[0]format=yuv420p[a];'
+                '[1]trim=end_frame=75,setpts=PTS-STARTPTS,format=yuv420p[b];'
+                '[2]trim=end_frame=75,setpts=PTS-STARTPTS,format=yuv420p[c];'
+                '[a][b][c]concat=n=3[v]',
+                '-map', '[v]', '-frames:v', '250', '-c:v', 'libx264', '-g', str(keyint), path]
+    subprocess.run(command, check=True)
+    return path
+
+
+@pytest.fixture
+def video_index(tmp_path, monkeypatch):
+    """Private VideoIndex cache for the test."""
+    if shutil.which('ffmpeg') is None or shutil.which('ffprobe') is None:
+        pytest.skip('ffmpeg and ffprobe are required')
+    from classificator.videoindex import VideoIndex
+    monkeypatch.setattr(VideoIndex, 'cache_dir', str(tmp_path / 'index'))
+    return VideoIndex
+
+
+@pytest.fixture
+def cut_video(tmp_path, video_index):
+    """Clip with cuts at frames 100 and 175 and a regular keyframe every 48 frames."""
+    return encode_clip(str(tmp_path / 'cuts.mp4'), 48)
+
+
+@pytest.fixture
+def scenecut_video(tmp_path, video_index):
+    """Clip with cuts at frames 100 and 175 whose only keyframes after the first are the encoder's scene cuts."""
+    return encode_clip(str(tmp_path / 'scenecut.mp4'), 250)
+
+
+@pytest.fixture
+def vfr_video(tmp_path, video_index):
+    """Variable frame rate clip: 100 frames at 25 fps followed by 100 at 10 fps."""
+    path = str(tmp_path / 'vfr.mp4')
+    subprocess.run(['ffmpeg', '-v', 'error', '-y', '-f', 'lavfi', '-i', 'testsrc=s=192x144:r=25:d=8',
+                    '-vf', "settb=1/50,setpts='if(lt(N,100),N*2,200+(N-100)*5)'", '-fps_mode', 'passthrough',
+                    '-frames:v', '200', '-c:v', 'libx264', '-g', '48', path], check=True)
+    return path
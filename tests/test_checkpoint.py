@@ -0,0 +1,48 @@
+import os
+from queue import Queue
+import pytest
+from classificator.checkpoint import ShotCheckpoint
+from classificator.classificator import detect_shots, video_process
+from classificator.comparator import CascadeComparator
+
+
+def run(path, workers, checkpoint=None, stop_after=None):
+    """Cuts as (frame, score) and the comparator stats; stop_after interrupts the run after that many cuts."""
+    comparator = CascadeComparator()
+    cuts = []
+    shots = detect_shots(path, workers, comparator, checkpoint=checkpoint)
+    for cut in shots:
+        cuts.append((cut.frame, cut.score))
+        if stop_after is not None and len(cuts) >= stop_after:
+            shots.close()
+            break
+    return cuts, comparator.stats
+
+
+@pytest.mark.parametrize('workers, every', [(1, 30), (3, 30), (3, 5000)])
+def test_resumed_run_matches_uninterrupted(cut_video, workers, every):
+    expected = run(cut_video, workers)
+    assert [frame for frame, _ in expected[0]] == [100, 175]
+    checkpoint = ShotCheckpoint(cut_video, every=every)
+    run(cut_video, workers, checkpoint, stop_after=1)
+    assert run(cut_video, workers, checkpoint) == expected
+    assert not os.path.exists(checkpoint.run(workers).checkpoint_file)
+
+
+@pytest.mark.parametrize('first, second', [(1, 3), (3, 1)])
+def test_resume_with_other_worker_count(cut_video, first, second):
+    expected = run(cut_video, second)
+    checkpoint = ShotCheckpoint(cut_video, every=30)
+    run(cut_video, first, checkpoint, stop_after=1)
+    assert run(cut_video, second, checkpoint) == expected
+    assert not [name for name in os.listdir(os.path.dirname(cut_video)) if '.shots.' in name]
+
+
+def test_chunk_resumes_from_its_snapshot(cut_video):
+    checkpoint = ShotCheckpoint(cut_video, every=25).chunk(96, 195)
+    results = Queue()
+    video_process(cut_video, 1, 96, 195, CascadeComparator(), None, results, None, checkpoint)
+    expected = results.get()
+    assert checkpoint.load()[0]['next_frame'] == 175
+    video_process(cut_video, 1, 96, 195, CascadeComparator(), None, results, None, checkpoint)
+    assert results.get() == expected
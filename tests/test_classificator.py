@@ -0,0 +1,38 @@
+import pytest
+
+from classificator.classificator import detect_shots, merge_chunk
+from classificator.comparator import CascadeComparator
+
+
+def chunk(head, cuts=(), state=(0, None), settled=True):
+    return 1, list(head), list(cuts), state, settled, {}
+
+
+def test_merge_chunk_completes_a_cut_pending_at_the_chunk_boundary():
+    assert merge_chunk((1, 30.0), chunk([(100, 80.0)])) == ((0, None), [(99, 30.0)])
+
+
+def test_merge_chunk_treats_a_low_pair_on_each_side_of_the_boundary_as_a_flash():
+    assert merge_chunk((1, 30.0), chunk([(100, 20.0), (101, 90.0)])) == ((0, None), [])
+    assert merge_chunk((0, None), chunk([(100, 20.0), (101, 90.0)])) == ((0, None), [(100, 20.0)])
+
+
+def test_merge_chunk_carries_the_state_through_an_unsettled_chunk():
+    state, cuts = merge_chunk((0, None), chunk([(100, 20.0)], state=(0, None), settled=False))
+    assert (state, cuts) == ((1, 20.0), [])
+    assert merge_chunk(state, chunk([(101, 90.0)], [(150, 10.0)], (0, 10.0))) == ((0, 10.0), [(100, 20.0), (150, 10.0)])
+
+
+def shots(path, workers):
+    comparator = CascadeComparator()
+    cuts = [(cut.frame, cut.score) for cut in detect_shots(path, workers, comparator)]
+    return cuts, comparator.stats
+
+
+@pytest.mark.parametrize('clip', ['cut_video', 'scenecut_video'])
+def test_chunked_detection_matches_a_single_pass(clip, request):
+    path = request.getfixturevalue(clip)
+    expected = shots(path, 1)
+    assert [frame for frame, _ in expected[0]] == [100, 175]
+    for workers in (2, 3, 5):
+        assert shots(path, workers) == expected, workers
@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+
+from classificator.classificator import cut_step
+from classificator.curve import SimilarityCurve
+
+
+def scan(scores, threshold):
+    """Cuts of cut_step over scores, with threshold mapped onto its fixed SSIM_THRESHOLD of 50."""
+    stack, temp, cuts = 0, None, []
+    for frame_num, score in enumerate(scores, 1):
+        stack, temp, cut = cut_step(stack, temp, score - threshold + 50, frame_num)
+        if cut is not None:
+            cuts.append((cut[0], cut[1] + threshold - 50))
+    return cuts
+
+
+@pytest.mark.parametrize('threshold', [30, 50, 70])
+def test_cut_frames_matches_cut_step(threshold):
+    rng = np.random.default_rng(3)
+    scores = rng.choice(np.array([10, 45, 60, 95], dtype=np.float32), 2000, p=[0.1, 0.1, 0.1, 0.7])
+    scores[:3] = 10
+    scores[-1] = 10
+    curve = SimilarityCurve('clip.mp4', scores, 25.0, 0)
+    frames, found = curve.cut_frames(threshold)
+    expected = scan(scores.tolist(), threshold)
+    assert len(expected) > 10
+    assert list(zip(frames.tolist(), found.tolist())) == pytest.approx(expected)
+    assert [cut.frame for cut in curve.cuts(threshold)] == [frame for frame, _ in expected]
+    assert curve.sweep([threshold]) == [(threshold, len(expected))]
+
+
+def test_stored_curve_is_reused_until_the_width_changes(cut_video):
+    built = SimilarityCurve.load(cut_video, 64)
+    assert [cut.frame for cut in built.cuts()] == [100, 175]
+    cached = SimilarityCurve.cached(cut_video, 64)
+    np.testing.assert_array_equal(cached.scores, built.scores)
+    assert SimilarityCurve.cached(cut_video, 96) is None
@@ -0,0 +1,39 @@
+import io
+import json
+
+from classificator.cuts import Cut, CSVWriter, EDLWriter, JSONWriter
+
+CUTS = [Cut.from_pair((100, 41.25), 25), Cut.from_pair((175, 12.5), 25)]
+
+
+def export(writer_class, *args, end_frame=250):
+    fp = io.StringIO()
+    writer = writer_class(fp, *args)
+    for cut in CUTS:
+        writer.write(cut)
+    writer.close(end_frame=end_frame)
+    return fp.getvalue()
+
+
+def test_csv_writer():
+    assert export(CSVWriter).splitlines() == ['cut,frame,time,score', '1,100,4.000,41.25', '2,175,7.000,12.50']
+
+
+def test_json_writer():
+    assert json.loads(export(JSONWriter)) == [{'frame': 100, 'time': 4.0, 'score': 41.25},
+                                              {'frame': 175, 'time': 7.0, 'score': 12.5}]
+    fp = io.StringIO()
+    JSONWriter(fp).close()
+    assert json.loads(fp.getvalue()) == []
+
+
+def test_edl_writer():
+    assert export(EDLWriter, 25).splitlines() == [
+        'TITLE: shots',
+        'FCM: NON-DROP FRAME',
+        '',
+        '001  AX       V     C        00:00:00:00 00:00:04:00 00:00:00:00 00:00:04:00',
+        '002  AX       V     C        00:00:04:00 00:00:07:00 00:00:04:00 00:00:07:00',
+        '003  AX       V     C        00:00:07:00 00:00:10:00 00:00:07:00 00:00:10:00',
+    ]
+    assert export(EDLWriter, 25, end_frame=None).count('\n0') == 2
@@ -0,0 +1,12 @@
+import numpy as np
+
+from classificator.decoder import FFmpegReader
+
+
+def test_start_frame_seeks_by_pts_on_variable_frame_rate(vfr_video):
+    with FFmpegReader(vfr_video, width=64) as reader:
+        frames = list(reader)
+    for start in (1, 50, 99, 100, 101, 150, len(frames) - 1):
+        with FFmpegReader(vfr_video, width=64, start_frame=start) as reader:
+            ret, frame = reader.read()
+        assert ret and np.array_equal(frame, frames[start]), start
@@ -0,0 +1,27 @@
+from classificator.classificator import detect_shots, verify_candidates
+from classificator.framebreaker import Framebreaker
+
+
+def rows(keyframes, count, size=200, key_size=5000):
+    return [(n, 'I' if n in keyframes else '?', key_size if n in keyframes else size, n / 25, n in keyframes)
+            for n in range(count)]
+
+
+def test_every_cut_keyframe_is_a_candidate():
+    keyframes = [0, 100, 230, 333, 430, 500]
+    candidates = Framebreaker().cut_candidates(rows(keyframes, 560))
+    assert set(keyframes[1:]) <= set(candidates)
+
+
+def test_p_frames_of_a_b_frame_pattern_are_not_candidates():
+    frames = [(n, '?', 900 if n % 3 == 0 else 100, n / 25, n == 0) for n in range(300)]
+    frames[150] = (150, '?', 9000, 6.0, False)
+    assert Framebreaker().cut_candidates(frames) == [150]
+
+
+def test_verified_candidates_match_dense_scan(scenecut_video):
+    breaker = Framebreaker()
+    breaker.path = scenecut_video
+    expected = [cut.frame for cut in detect_shots(scenecut_video, 1)]
+    assert expected == [100, 175]
+    assert [cut.frame for cut in verify_candidates(scenecut_video, breaker.cut_candidates())] == expected
@@ -0,0 +1,22 @@
+import os
+
+from classificator.pipeline import KeyframeStage, Pipeline
+
+
+def test_keyframe_stage_writes_index_keyframes_without_frame_types(cut_video, video_index, tmp_path, monkeypatch):
+    build = video_index.build.__func__
+
+    def build_without_types(cls, path, types=False):
+        assert types is False
+        return build(cls, path, types)
+
+    monkeypatch.setattr(video_index, 'build', classmethod(build_without_types))
+    output = tmp_path / 'keyframes'
+    output.mkdir()
+    pipeline = Pipeline(cut_video)
+    pipeline.add_stage(KeyframeStage(str(output)))
+    written = pipeline.run()['keyframes']
+    keyframes = video_index.load(cut_video).keyframes.tolist()
+    assert keyframes[:3] == [0, 48, 96]
+    assert written == [os.path.join(str(output), f'cuts_i_frame_{n}.jpg') for n in keyframes]
+    assert sorted(os.listdir(output)) == sorted(os.path.basename(name) for name in written)
@@ -0,0 +1,9 @@
+from classificator.classificator import detect_shots, shared_shots
+
+
+def test_shared_shots_match_a_single_scan(cut_video):
+    expected = [(cut.frame, round(cut.score, 6)) for cut in detect_shots(cut_video, 1)]
+    assert [frame for frame, _ in expected] == [100, 175]
+    for max_bytes in (256 << 20, 192 * 144 * 6):
+        cuts = [(cut.frame, round(cut.score, 6)) for cut in shared_shots(cut_video, 3, max_bytes=max_bytes)]
+        assert cuts == expected, max_bytes
@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+
+from classificator.similarity import SSIMEngine
+
+metrics = pytest.importorskip('skimage.metrics')
+
+
+def frames():
+    rng = np.random.default_rng(7)
+    base = rng.integers(0, 256, (5, 72, 96), dtype=np.uint8)
+    noise = rng.integers(-40, 41, base.shape)
+    return np.concatenate([base[:1], np.clip(base[:1] + noise[:2], 0, 255).astype(np.uint8), base[1:]])
+
+
+def skimage_ssim(old, new):
+    return metrics.structural_similarity(old, new, data_range=255)
+
+
+def test_push_and_score_stack_match_skimage():
+    stack = frames()
+    expected = [skimage_ssim(old, new) for old, new in zip(stack[:-1], stack[1:])]
+    engine = SSIMEngine()
+    assert engine.push(stack[0]) is None
+    pushed = [engine.push(gray) / 100 for gray in stack[1:]]
+    np.testing.assert_allclose(pushed, expected, rtol=0, atol=1e-9)
+    np.testing.assert_allclose(engine.score_stack(stack), expected, rtol=0, atol=1e-9)
+    np.testing.assert_allclose(engine.score_pairs(stack[:-1], stack[1:]), expected, rtol=0, atol=1e-9)
+
+
+@pytest.mark.parametrize('threshold', [0, 20, 50, 90, 100])
+def test_decide_agrees_with_skimage(threshold):
+    engine = SSIMEngine()
+    stack = frames()
+    for old, new in zip(stack[:-1], stack[1:]):
+        expected = skimage_ssim(old, new) * 100
+        score, exact = engine.decide(old, new, threshold, tile=16)
+        assert (score < threshold) == (expected < threshold)
+        if exact:
+            assert score == pytest.approx(expected, abs=1e-7)
@@ -0,0 +1,84 @@
+import os
+from collections import deque
+from concurrent.futures import Future
+
+import classificator.thumbnailer as thumbnailer_module
+from classificator.framecache import FrameCache
+from classificator.thumbnailer import Thumbnailer
+
+
+def test_best_framenum_reads_existing_cache_entries_only(cut_video, tmp_path, monkeypatch):
+    thumb = Thumbnailer()
+    thumb.frame_cache = FrameCache(str(tmp_path / 'frames'))
+    decoded = thumb.best_framenum(cut_video, 250, 125)
+    assert not os.path.exists(thumb.frame_cache.cache_dir)
+    thumb.frame_cache.build(cut_video)
+
+    def no_decode(*args, **kwargs):
+        raise AssertionError('decoded although the cache holds the video')
+
+    monkeypatch.setattr(thumbnailer_module, 'FFmpegReader', no_decode)
+    cached = thumb.best_framenum(cut_video, 250, 125)
+    # The candidates span candidate_window (10%) of the 250 frames around frame 125.
+    assert 113 <= decoded <= 137 and 113 <= cached <= 137
+
+
+def done_future(path, output):
+    future = Future()
+    future.set_result({'path': path, 'output': output, 'error': None})
+    return future
+
+
+def test_checkpoint_leaves_videos_finishing_during_the_flush_for_the_next_one(tmp_path):
+    thumb = Thumbnailer()
+    thumb.output = str(tmp_path)
+    finished = deque([done_future('a.mp4', 'a_thumbnail.jpg')])
+
+    class Writer:
+        def flush(self):
+            # b.mp4 finishes while the images queued so far are written; its own image fails later.
+            finished.append(done_future('b.mp4', 'b_thumbnail.jpg'))
+            return []
+
+    thumb.writer = Writer()
+    summary, failures, manifest = {}, {}, {}
+    signatures = {'a.mp4': (1, 1), 'b.mp4': (2, 2)}
+    thumb.checkpoint(finished, summary, signatures, failures, manifest)
+    assert list(summary) == ['a.mp4'] and len(finished) == 1
+    thumb.writer.flush = lambda: [('b_thumbnail.jpg', 'disk full')]
+    thumb.checkpoint(finished, summary, signatures, failures, manifest)
+    assert summary['b.mp4']['error'] == 'disk full'
+    assert manifest[os.path.abspath('a.mp4')]['output'] == 'a_thumbnail.jpg'
+    assert os.path.abspath('b.mp4') not in manifest
+
+
+def run_batch(source, output, **settings):
+    thumb = Thumbnailer()
+    thumb.path = source
+    thumb.output = output
+    thumb.incremental = True
+    for name, value in settings.items():
+        setattr(thumb, name, value)
+    summary = thumb.execute()
+    assert [item['error'] for item in summary] == [None]
+    return summary[0]
+
+
+def test_incremental_runs_skip_current_thumbnails_and_redo_changed_ones(cut_video, tmp_path):
+    source = tmp_path / 'videos'
+    source.mkdir()
+    video = source / 'clip.mp4'
+    os.replace(cut_video, video)
+    output = str(tmp_path / 'thumbnails')
+    os.mkdir(output)
+    first = run_batch(str(source), output)
+    assert first['skipped'] is False and os.path.isfile(first['output'])
+    assert run_batch(str(source), output)['skipped'] is True
+    changed = run_batch(str(source), output, frame_preset='middle')
+    assert changed['skipped'] is False
+    assert run_batch(str(source), output, frame_preset='middle')['skipped'] is True
+    stat = os.stat(video)
+    os.utime(video, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert run_batch(str(source), output, frame_preset='middle')['skipped'] is False
+    os.remove(changed['output'])
+    assert run_batch(str(source), output, frame_preset='middle')['skipped'] is False